@@ -0,0 +1,134 @@
+import FreeCAD as App
+import csv
+import math
+import re
+from collections import Counter
+from pathlib import Path
+
+_pack_dash = re.compile(r".*-P([0-9]+)$")
+_pack_paren = re.compile(r"(.*?) ?\(P([0-9]+)\)$")
+
+def parse_part_number(part_number):
+    '''
+    Split a part number into the number to order and the number of parts per pack
+
+    Args:
+        part_number (string): A part number, optionally ending in -P# or (P#) for packs
+    '''
+    match = _pack_paren.match(part_number)
+    if match != None:
+        return match.group(1), int(match.group(2))
+    match = _pack_dash.match(part_number)
+    if match != None:
+        return part_number, int(match.group(1))
+    return part_number, 1
+
+class BOM:
+    '''
+    A bill of materials collected from one or more documents
+
+    Attributes:
+        parts (Counter): The quantity of each part number
+        types (Counter): The quantity of each (part class, part number) pair
+        missing (string[]): The full names of components which are missing a part number
+    '''
+    def __init__(self):
+        self.parts = Counter()
+        self.types = Counter()
+        self.missing = []
+
+    def add(self, name, proxy):
+        '''
+        Add the part numbers of a component
+
+        Args:
+            name (string): The full name of the component
+            proxy (object): The component's proxy holding its part_numbers
+        '''
+        for num in proxy.part_numbers:
+            if num == '':
+                self.missing.append(name)
+            else:
+                self.parts[num] += 1
+                self.types[(type(proxy).__name__, num)] += 1
+
+    def update(self, other):
+        '''
+        Add every part from another BOM to this one
+
+        Args:
+            other (BOM): The BOM to merge in
+        '''
+        self.parts.update(other.parts)
+        self.types.update(other.types)
+        self.missing.extend(other.missing)
+
+    def order(self):
+        '''
+        Get the number of packs to order for each part as a list of (part number, quantity)
+        '''
+        rows = []
+        for part, count in sorted(self.parts.items()):
+            number, pack = parse_part_number(part)
+            rows.append((number, math.ceil(count/pack)))
+        return rows
+
+    def parts_list(self):
+        '''
+        Get every part by class as a list of (part class / name, part number, quantity)
+        '''
+        rows = []
+        for (part_type, part), count in sorted(self.types.items()):
+            number, pack = parse_part_number(part)
+            rows.append((part_type, number, math.ceil(count/pack)))
+        for name in self.missing:
+            rows.append((name, "Unknown", 1))
+        return rows
+
+    def write_csv(self, path):
+        '''
+        Write the Thorlabs cart and full parts list as csv files
+
+        Args:
+            path (string): The directory to write the files into
+        '''
+        path = Path(path)
+        with open(str(path / "Thorlabs_Cart.csv"), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Part Number", "Qty"])
+            writer.writerows(self.order())
+        with open(str(path / "Parts_List.csv"), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Part Class / Name", "Part Number", "Qty"])
+            writer.writerows(self.parts_list())
+
+# get the name of an object prefixed by its parents, memoized across a collection
+def _full_name(obj, names):
+    if obj.Name not in names:
+        if hasattr(obj, "ParentObject") and obj.ParentObject != None:
+            names[obj.Name] = _full_name(obj.ParentObject, names) + " - " + obj.Label
+        else:
+            names[obj.Name] = obj.Label
+    return names[obj.Name]
+
+def collect(docs=None):
+    '''
+    Collect the bill of materials of every component in one or more documents
+
+    Linked copies of components, such as repeated subassemblies, are counted once per link
+
+    Args:
+        docs (Document[]): The documents to collect from, defaults to the active document
+    '''
+    if docs == None:
+        docs = [App.ActiveDocument]
+    bom = BOM()
+    for doc in docs:
+        names = {}
+        for obj in doc.Objects:
+            target = obj
+            if obj.isDerivedFrom("App::Link"):
+                target = obj.getLinkedObject(True)
+            if hasattr(target, "Proxy") and hasattr(target.Proxy, 'part_numbers'):
+                bom.add(_full_name(target, names), target.Proxy)
+    return bom
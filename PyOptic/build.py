@@ -0,0 +1,93 @@
+import FreeCAD as App
+import argparse
+import os
+import runpy
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from . import layout, export, bom, workers
+
+def build(script, output, processes=None, incremental=True):
+    '''
+    Run a layout script without the GUI, then redraw it and export its STLs and bill of materials
+
+    Args:
+        script (string): Path to the layout script to run
+        output (string): Directory to export into, each layout is written to a folder named after its script
+        processes (int): The number of worker processes for building and tessellation, defaults to the number of cores
+        incremental (bool): Whether to reuse unchanged files from the last build
+    '''
+    script = Path(script).resolve()
+    doc = App.newDocument(script.stem)
+    App.setActiveDocument(doc.Name)
+
+    # layout scripts import their neighbours, such as modular baseplates used on a table
+    sys.path.insert(0, str(script.parent))
+    try:
+        runpy.run_path(str(script), run_name="__main__")
+        layout.redraw(processes=processes)
+        path = export.export_stls(Path(output) / script.stem, doc, processes, incremental=incremental)
+        bom.collect([doc]).write_csv(path)
+    finally:
+        sys.path.remove(str(script.parent))
+        App.closeDocument(doc.Name)
+    return path
+
+# build a single layout in a separate interpreter
+def _build_process(args):
+    script, output, processes, incremental = args
+    python = workers._find_python()
+    env = dict(os.environ)
+    paths = workers._worker_paths()+[env.get("PYTHONPATH", "")]
+    env["PYTHONPATH"] = os.pathsep.join(i for i in paths if i != "")
+    cmd = [python, "-m", "PyOptic.build", "-o", output, "-j", "1", script]
+    if processes != None:
+        cmd += ["-p", str(processes)]
+    if not incremental:
+        cmd += ["--full"]
+    return subprocess.run(cmd, env=env).returncode
+
+def main(argv=None):
+    '''
+    Command line entry point for headless builds
+
+    Run with a python interpreter which can import FreeCAD, for example
+    python -m PyOptic.build -o build examples/ECDL.py examples/Rb_SAS.py
+    or from FreeCADCmd with
+    FreeCADCmd -c "from PyOptic import build; build.main(['-o', 'build', 'examples/ECDL.py'])"
+
+    Args:
+        argv (string[]): The command line arguments, defaults to sys.argv
+    '''
+    parser = argparse.ArgumentParser(prog="PyOptic.build", description="Build PyOptic layouts and export their STLs and bill of materials")
+    parser.add_argument("scripts", nargs="+", help="layout scripts to build")
+    parser.add_argument("-o", "--output", default="build", help="directory to export into")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of layouts to build at once in separate processes")
+    parser.add_argument("-p", "--processes", type=int, default=None, help="number of worker processes per layout")
+    parser.add_argument("--full", action="store_true", help="re-export every part instead of reusing unchanged files")
+    args = parser.parse_args(argv)
+
+    failed = []
+    if args.jobs > 1 and len(args.scripts) > 1 and workers._find_python() != None:
+        jobs = [(i, args.output, args.processes, not args.full) for i in args.scripts]
+        with ThreadPoolExecutor(args.jobs) as pool:
+            for script, code in zip(args.scripts, pool.map(_build_process, jobs)):
+                if code != 0:
+                    failed.append(script)
+    else:
+        for script in args.scripts:
+            try:
+                path = build(script, args.output, args.processes, not args.full)
+                App.Console.PrintMessage("Built '%s' to '%s'\n"%(script, str(path)))
+            except Exception as err:
+                App.Console.PrintError("Failed to build '%s': %s\n"%(script, str(err)))
+                failed.append(script)
+
+    if len(failed) > 0:
+        App.Console.PrintError("%d of %d layouts failed\n"%(len(failed), len(args.scripts)))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
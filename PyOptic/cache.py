@@ -0,0 +1,190 @@
+import FreeCAD as App
+import Part
+import hashlib
+import inspect
+import os
+from functools import wraps
+from pathlib import Path
+
+format_version = 1 # bump when the layout of cache entries changes
+max_size = 512*2**20 # bytes of BREP files to keep on disk
+enabled = True
+
+# properties which only position an object and never change its shape
+_placement_props = {"Placement", "BasePlacement", "RelativePlacement", "Angle", "Distance", "xPos", "yPos",
+                    "BeamIndex", "PreRefs", "Label", "Label2", "Visibility", "ExpressionEngine"}
+# links, outputs and the proxy itself, links which matter are followed separately
+_skipped_kinds = ["Part::PropertyPartShape", "Mesh::PropertyMeshKernel", "App::PropertyPythonObject"]
+_code_hashes = {}
+_size = None
+
+def cache_path():
+    '''
+    Get the directory shapes are cached in
+    '''
+    return Path(App.getUserCachePath()) / "PyOptic" / "shapes"
+
+# hash of the source file a class is defined in, so editing a component invalidates its entries
+def _code_hash(cls):
+    path = inspect.getsourcefile(cls)
+    if path not in _code_hashes:
+        with open(path, "rb") as f:
+            _code_hashes[path] = hashlib.sha1(f.read()).hexdigest()
+    return _code_hashes[path]
+
+# simple values which can be written into a key
+def _is_plain(value):
+    if isinstance(value, (bool, int, float, str, type(None))):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(_is_plain(i) for i in value)
+    if isinstance(value, dict):
+        return all(_is_plain(i) for i in value.values())
+    return False
+
+# everything about an object which its shape is built from
+def _state(obj):
+    state = [type(obj.Proxy).__name__]
+    for prop in sorted(obj.PropertiesList):
+        kind = obj.getTypeIdOfProperty(prop)
+        if prop in _placement_props or kind.startswith("App::PropertyLink") or kind in _skipped_kinds:
+            continue
+        state.append((prop, repr(getattr(obj, prop))))
+    state.extend(sorted((k, repr(v)) for k, v in vars(obj.Proxy).items() if _is_plain(v)))
+    if hasattr(obj, "Baseplate") and obj.Baseplate != None:
+        state.append(("OpticsDz", obj.Baseplate.OpticsDz.Value))
+    if hasattr(obj, "RelativePlacement"):
+        from . import optomech
+        state.append(("RelativePlacement", tuple(optomech._relative_placement(obj).toMatrix().A)))
+    return state
+
+# state of every sub-part drilled into an object, positioned as optomech._drill_part places them
+def _children(obj, root, state):
+    if not hasattr(obj, "ChildObjects"):
+        return
+    for child in obj.ChildObjects:
+        if hasattr(child, "Proxy") and child.Proxy != None:
+            placement = root.BasePlacement.inverse().multiply(child.Placement)
+            state.append((_state(child), tuple(placement.toMatrix().A)))
+        _children(child, root, state)
+
+def key(obj):
+    '''
+    Get the cache key of a component from its class, source code and parameters
+
+    Args:
+        obj (object): The component to build a key for
+    '''
+    state = [format_version, _code_hash(type(obj.Proxy)), _state(obj)]
+    if hasattr(obj, "BasePlacement"):
+        _children(obj, obj, state)
+    return hashlib.sha1(repr(state).encode()).hexdigest()
+
+def _shape_props(obj):
+    return sorted(i for i in obj.PropertiesList if obj.getTypeIdOfProperty(i) == "Part::PropertyPartShape")
+
+def has(key):
+    '''
+    Check if there are shapes stored under a key
+
+    Args:
+        key (string): The cache key
+    '''
+    return (cache_path() / (key + ".brep")).is_file()
+
+def load(key):
+    '''
+    Load the shapes stored under a key, returns None if there is no entry
+
+    Args:
+        key (string): The cache key
+    '''
+    path = cache_path() / (key + ".brep")
+    if not path.is_file():
+        return None
+    try:
+        shape = Part.Shape()
+        shape.read(str(path))
+        os.utime(path) # entries are evicted by last use
+    except Exception:
+        path.unlink()
+        return None
+    return [i if len(i.SubShapes) > 0 or i.ShapeType != "Compound" else Part.Shape() for i in shape.SubShapes]
+
+def store(key, shapes):
+    '''
+    Store a list of shapes under a key, evicting the least recently used entries past max_size
+
+    Args:
+        key (string): The cache key
+        shapes (Shape[]): The shapes to store, null shapes are stored as empty
+    '''
+    global _size
+    path = cache_path()
+    path.mkdir(parents=True, exist_ok=True)
+    temp = path / (key + ".tmp")
+    Part.Compound([Part.Compound([]) if i.isNull() else i for i in shapes]).exportBrep(str(temp))
+    os.replace(temp, path / (key + ".brep"))
+
+    if _size == None:
+        _size = sum(i.stat().st_size for i in path.glob("*.brep"))
+    else:
+        _size += (path / (key + ".brep")).stat().st_size
+    if _size > max_size:
+        _evict(path)
+
+# remove the least recently used entries until the cache is back under three quarters of max_size
+def _evict(path):
+    global _size
+    entries = sorted((i.stat().st_mtime, i.stat().st_size, i) for i in path.glob("*.brep"))
+    _size = sum(i[1] for i in entries)
+    for _, size, entry in entries:
+        if _size <= max_size*3/4:
+            break
+        entry.unlink()
+        _size -= size
+
+def clear():
+    '''
+    Remove every cached shape
+    '''
+    global _size
+    for i in cache_path().glob("*.brep"):
+        i.unlink()
+    _size = 0
+
+def cached(execute):
+    '''
+    Decorator for component execute methods which only build shapes from their parameters
+
+    Every shape property is stored in a BREP file keyed by the component's class, source code
+    and parameter values. On a hit the shapes are loaded instead of running execute, with
+    drill parts moved to the object's placement as execute would leave them
+
+    Args:
+        execute (function): The execute method of a Part::FeaturePython component
+    '''
+    @wraps(execute)
+    def wrapper(self, obj):
+        if not enabled:
+            return execute(self, obj)
+        try:
+            k = key(obj)
+        except Exception:
+            return execute(self, obj)
+        props = _shape_props(obj)
+        shapes = load(k)
+        if shapes != None and len(shapes) == len(props):
+            for prop, shape in zip(props, shapes):
+                if prop != "Shape":
+                    shape.Placement = obj.Placement
+                setattr(obj, prop, shape)
+            return
+        result = execute(self, obj)
+        try:
+            store(k, [getattr(obj, i) for i in props])
+        except OSError as err:
+            App.Console.PrintWarning("Couldn't cache %s: %s\n"%(obj.Label, str(err)))
+        return result
+    wrapper.parametric = True # only built from parameters, so it can be built outside the document
+    return wrapper
@@ -0,0 +1,187 @@
+import FreeCAD as App
+import Mesh
+import MeshPart
+import Part
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from pathlib import Path
+from . import layout, optomech, workers
+
+# tessellation used for each part class, anything not listed uses the export defaults
+tessellation_profiles = {"baseplate": dict(linear=0.1, angular=0.5),
+                         "baseplate_cover": dict(linear=0.3, angular=1.0)}
+
+# get the next unused index for a numbered directory with the given prefix
+def _next_index(prefix):
+    n = 0
+    while Path(prefix+str(n)).is_dir():
+        n += 1
+    return n
+
+# check if an object is a printed part which should be exported
+def _is_printed(obj):
+    if not hasattr(obj, "Proxy"):
+        return False
+    if isinstance(obj.Proxy, (layout.baseplate, layout.baseplate_cover)):
+        return True
+    color = getattr(obj.Proxy, "color", None)
+    if obj.ViewObject != None:
+        color = obj.ViewObject.ShapeColor
+    return color != None and all(np.isclose(color[:3], optomech.adapter_color))
+
+# the object a link stands for and the global placement the link adds, so linked subassemblies are exported too
+def _resolve_link(obj):
+    if not obj.isDerivedFrom("App::Link"):
+        return obj, None
+    return obj.getLinkedObject(True), obj.getGlobalPlacement()
+
+# hash of a mesh's geometry, including its placement
+def _mesh_hash(mesh):
+    points, facets = mesh.Topology
+    data = hashlib.sha1(np.array([tuple(i) for i in points]).tobytes())
+    data.update(np.array(facets).tobytes())
+    return data.hexdigest()
+
+def _read_manifest(path):
+    if path == None or not (Path(path) / "manifest.json").is_file():
+        return {}
+    with open(Path(path) / "manifest.json") as f:
+        return json.load(f).get("parts", {})
+
+# link or copy an unchanged file from the previous export, returns false if it needs rewriting
+def _reuse(previous, path, filename, old, entry):
+    if previous == None or old.get(filename) != entry:
+        return False
+    src = Path(previous) / filename
+    dst = Path(path) / filename
+    if not src.is_file():
+        return False
+    if src.resolve() == dst.resolve():
+        return True
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return True
+
+# tessellate and write a single solid as binary STL, run in a worker process
+def _write_solid(job):
+    brep, filename, linear, angular = job
+    shape = Part.Shape()
+    shape.importBrepFromString(brep)
+    mesh = MeshPart.meshFromShape(Shape=shape, LinearDeflection=linear, AngularDeflection=angular, Relative=False)
+    mesh.write(filename, "STL")
+    return filename
+
+# bundle exported STL files into a single 3MF archive with one object per part
+def _write_3mf(filename, files):
+    active = App.ActiveDocument
+    doc = App.newDocument("PyOpticExport", hidden=True)
+    try:
+        objs = []
+        for i in files:
+            obj = doc.addObject("Mesh::Feature", Path(i).stem)
+            obj.Mesh = Mesh.Mesh(str(i))
+            objs.append(obj)
+        Mesh.export(objs, str(filename))
+    finally:
+        App.closeDocument(doc.Name)
+        # the scratch document became the active one, hand it back to the layout
+        if active != None:
+            App.setActiveDocument(active.Name)
+
+# console progress for headless exports
+def _print_progress(done, total):
+    App.Console.PrintMessage("Exported %d/%d\n"%(done, total))
+
+def export_stls(path=None, doc=None, processes=None, progress=None, incremental=False, previous=None,
+                linear_deflection=0.05, angular_deflection=0.3, profiles=None, archive=False):
+    '''
+    Export every printed part in a document as binary STL files, tessellating solids in parallel
+
+    A manifest of geometry hashes is written with every export. In incremental mode,
+    parts whose hash matches the previous export are linked from it instead of rewritten
+
+    Args:
+        path (string): The directory to export to, defaults to a new numbered folder in Downloads
+        doc (Document): The document to export, defaults to the active document
+        processes (int): The number of worker processes, defaults to the number of cores
+        progress (function): Called with the number of finished files and the total after each file
+        incremental (bool): Whether to reuse unchanged files from the previous export
+        previous (string): The previous export directory, defaults to the target directory if it has a manifest or else the last numbered export
+        linear_deflection (float): Maximum distance between the tessellation and the true surface in mm
+        angular_deflection (float): Maximum angle between adjacent facets on curved surfaces in radians
+        profiles (dict): Tessellation settings per part class name, defaults to tessellation_profiles
+        archive (bool): Whether to also bundle every part into a single 3MF file
+    '''
+    if path == None:
+        prefix = str(Path.home() / "Downloads" / "FreeCAD_Optics_Export_")
+        n = _next_index(prefix)
+        path = prefix+str(n)
+        if previous == None and n > 0:
+            previous = prefix+str(n-1)
+    path = Path(path)
+    if previous == None and (path / "manifest.json").is_file():
+        previous = path
+    path.mkdir(parents=True, exist_ok=True)
+    if doc == None:
+        doc = App.ActiveDocument
+    if progress == None:
+        progress = _print_progress
+
+    old = _read_manifest(previous) if incremental else {}
+    if profiles == None:
+        profiles = tessellation_profiles
+    manifest = {}
+    jobs = []
+    for link in doc.Objects:
+        obj, placement = _resolve_link(link)
+        if not _is_printed(obj):
+            continue
+        settings = dict(linear=linear_deflection, angular=angular_deflection)
+        settings.update(profiles.get(type(obj.Proxy).__name__, {}))
+        if hasattr(obj, "Shape"):
+            # previewed baseplates are only drilled when they're exported
+            if isinstance(obj.Proxy, layout.baseplate):
+                exploded = obj.Proxy.exact_shape(obj).Solids
+            else:
+                exploded = obj.Shape.Solids
+            for i, shape in enumerate(exploded):
+                name = link.Name
+                if len(exploded) > 1:
+                    name += "_" + str(i)
+                if placement != None:
+                    shape = shape.copy()
+                    shape.Placement = placement.multiply(shape.Placement)
+                brep = shape.exportBrepToString()
+                manifest[name + ".stl"] = dict(hash=hashlib.sha1(brep.encode()).hexdigest(), settings=settings)
+                if not _reuse(previous, path, name + ".stl", old, manifest[name + ".stl"]):
+                    jobs.append((brep, str(path / name) + ".stl", settings["linear"], settings["angular"]))
+        else:
+            # meshes are written as they are, tessellation settings don't apply
+            mesh = optomech._mesh(obj)
+            if placement != None:
+                mesh = mesh.copy()
+                mesh.Placement = placement.multiply(mesh.Placement)
+            manifest[link.Name + ".stl"] = dict(hash=_mesh_hash(mesh), settings={})
+            if not _reuse(previous, path, link.Name + ".stl", old, manifest[link.Name + ".stl"]):
+                mesh.write(str(path / link.Name) + ".stl", "STL")
+
+    for _ in workers.imap(_write_solid, jobs, processes, progress):
+        pass
+
+    # an export over an older one shouldn't keep files for parts which no longer exist
+    if previous != None and Path(previous).resolve() == path.resolve():
+        for name in _read_manifest(path):
+            if name not in manifest and (path / name).is_file():
+                (path / name).unlink()
+    with open(path / "manifest.json", "w") as f:
+        json.dump(dict(version=1, parts=manifest), f, indent=1)
+    if archive:
+        _write_3mf(path / (doc.Name + ".3mf"), [path / i for i in manifest])
+    return path
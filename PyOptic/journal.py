@@ -0,0 +1,232 @@
+import FreeCAD as App
+import json
+import hashlib
+import importlib
+import inspect
+from contextlib import ExitStack
+from functools import wraps
+import numpy as np
+
+format_version = 1
+
+_journals = {} # recorded layout calls for each document
+_depth = 0 # calls made from inside a recorded call are rebuilt by their caller
+
+def recorded(func):
+    '''
+    Decorator for layout functions which should be captured in the document journal
+
+    Only the outermost recorded call is stored, along with the names of every
+    object it created so references can be remapped when the layout is loaded.
+
+    Args:
+        func (function): The layout function or baseplate method to record
+    '''
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        global _depth
+        doc = App.ActiveDocument
+        if _depth > 0 or doc == None:
+            return func(*args, **kwargs)
+
+        # constructors are recorded by class, methods by the baseplate they act on
+        call_args = list(args)
+        target = None
+        if func.__name__ == "__init__":
+            call = func.__qualname__.split(".")[0]
+            call_args = call_args[1:]
+        elif "." in func.__qualname__:
+            call = func.__name__
+            target = args[0].active_baseplate
+            call_args = call_args[1:]
+        else:
+            call = func.__name__
+
+        entry = dict(call=call, target=target)
+        try:
+            entry["args"] = _encode(call_args)
+            entry["kwargs"] = _encode(kwargs)
+        except TypeError as err:
+            entry["error"] = str(err)
+
+        existing = set(i.Name for i in doc.Objects)
+        _depth += 1
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _depth -= 1
+        entry["created"] = [i.Name for i in doc.Objects if i.Name not in existing]
+        _journals.setdefault(doc.Name, []).append(entry)
+        return result
+    return wrapper
+
+def clear(doc=None):
+    '''
+    Discard the recorded journal of a document
+
+    Args:
+        doc (Document): The document to clear, defaults to the active document
+    '''
+    if doc == None:
+        doc = App.ActiveDocument
+    _journals.pop(doc.Name, None)
+
+# convert a call argument to plain json data
+def _encode(value):
+    if isinstance(value, np.ndarray):
+        return _encode(value.tolist())
+    if value == None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, list):
+        return [_encode(i) for i in value]
+    if isinstance(value, tuple):
+        return {"tuple": [_encode(i) for i in value]}
+    if isinstance(value, dict):
+        return {"dict": {str(k): _encode(v) for k, v in value.items()}}
+    if isinstance(value, App.DocumentObject):
+        return {"object": value.Name}
+    if isinstance(value, App.Vector):
+        return {"vector": list(value)}
+    if isinstance(value, App.Placement):
+        return {"placement": list(value.Base)+list(value.Rotation.Q)}
+    if inspect.isclass(value) or inspect.isfunction(value):
+        return {"class": [value.__module__, value.__qualname__]}
+    raise TypeError("Cannot record argument of type %s"%(type(value).__name__))
+
+# rebuild a call argument from json data, mapping recorded object names to new ones
+def _decode(value, doc, names):
+    if isinstance(value, list):
+        return [_decode(i, doc, names) for i in value]
+    if not isinstance(value, dict):
+        return value
+    if "tuple" in value:
+        return tuple(_decode(i, doc, names) for i in value["tuple"])
+    if "dict" in value:
+        return {k: _decode(v, doc, names) for k, v in value["dict"].items()}
+    if "object" in value:
+        return doc.getObject(names.get(value["object"], value["object"]))
+    if "vector" in value:
+        return App.Vector(*value["vector"])
+    if "placement" in value:
+        p = value["placement"]
+        return App.Placement(App.Vector(*p[:3]), App.Rotation(*p[3:]))
+    if "class" in value:
+        module, qualname = value["class"]
+        obj = importlib.import_module(module)
+        for attr in qualname.split("."):
+            obj = getattr(obj, attr)
+        return obj
+    raise ValueError("Unknown journal value %s"%(str(value)))
+
+# short hash of an object's computed geometry, used to compare layouts
+def _shape_hash(obj):
+    from . import optomech
+    if hasattr(obj, "Shape"):
+        data = obj.Shape.exportBrepToString()
+    elif hasattr(obj, "Mesh"):
+        mesh = optomech._mesh(obj)
+        bound = mesh.BoundBox
+        data = "%d %d %.6f %.6f %.6f %.6f %.6f %.6f %.6f"%(mesh.CountPoints, mesh.CountFacets, mesh.Area,
+                                                         bound.XMin, bound.YMin, bound.ZMin, bound.XMax, bound.YMax, bound.ZMax)
+    else:
+        return None
+    return hashlib.sha1(data.encode()).hexdigest()
+
+def save(path, doc=None, cache=True):
+    '''
+    Save the recorded layout calls of a document to a json file
+
+    Args:
+        path (string): The file path to write to
+        doc (Document): The document to save, defaults to the active document
+        cache (bool): Whether to include traced beams, placements and shape hashes
+    '''
+    from . import laser
+    if doc == None:
+        doc = App.ActiveDocument
+    entries = _journals.get(doc.Name, [])
+    errors = [i["error"] for i in entries if "error" in i]
+    if len(errors) > 0:
+        raise ValueError("Layout contains calls which could not be recorded: %s"%(", ".join(errors)))
+
+    data = dict(version=format_version, entries=entries)
+    if cache:
+        beams, placements, hashes = {}, {}, {}
+        for obj in doc.Objects:
+            if hasattr(obj, "Proxy") and isinstance(obj.Proxy, laser.beam_path) and hasattr(obj.Proxy, "beams"):
+                beams[obj.Name] = [[float(x) for x in i[:5]] for i in obj.Proxy.beams]
+            if hasattr(obj, "BasePlacement"):
+                placements[obj.Name] = _encode(obj.BasePlacement)["placement"]
+            shape_hash = _shape_hash(obj)
+            if shape_hash != None:
+                hashes[obj.Name] = shape_hash
+        data["cache"] = dict(beams=beams, placements=placements, hashes=hashes)
+
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1)
+
+def load(path, doc=None, cache=True, recompute=True):
+    '''
+    Rebuild a layout from a json file written by save, without rerunning its macro
+
+    Args:
+        path (string): The file path to read from
+        doc (Document): The document to build into, a new document is created if not given
+        cache (bool): Whether to reuse cached beams and placements instead of retracing
+        recompute (bool): Whether to recompute the document once it is built
+    '''
+    from . import layout
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != format_version:
+        raise ValueError("Unsupported layout file version %s"%(str(data.get("version"))))
+    if doc == None:
+        doc = App.newDocument()
+    App.setActiveDocument(doc.Name)
+
+    names = {}
+    with ExitStack() as stack:
+        batch = None
+        for entry in data["entries"]:
+            # every call on a baseplate is replayed inside that baseplate's batch
+            target = names.get(entry["target"], entry["target"])
+            if target != batch:
+                stack.close()
+                if target != None:
+                    stack.enter_context(doc.getObject(target).Proxy.batch())
+                batch = target
+
+            args = _decode(entry["args"], doc, names)
+            kwargs = _decode(entry["kwargs"], doc, names)
+            existing = set(i.Name for i in doc.Objects)
+            if target != None:
+                getattr(doc.getObject(target).Proxy, entry["call"])(*args, **kwargs)
+            else:
+                getattr(layout, entry["call"])(*args, **kwargs)
+            created = [i.Name for i in doc.Objects if i.Name not in existing]
+            names.update(zip(entry["created"], created))
+
+    if cache and "cache" in data:
+        _apply_cache(doc, data["cache"], names, recompute)
+    elif recompute:
+        layout.redraw()
+    return doc
+
+# restore cached traces so beam paths don't need to be recalculated
+def _apply_cache(doc, cache, names, recompute):
+    paths = []
+    for name, placement in cache["placements"].items():
+        obj = doc.getObject(names.get(name, name))
+        if obj != None and hasattr(obj, "BeamIndex"):
+            obj.BasePlacement = _decode({"placement": placement}, doc, names)
+    for name, beams in cache["beams"].items():
+        obj = doc.getObject(names.get(name, name))
+        if obj != None:
+            obj.Proxy.load_beams(obj, beams)
+            paths.append(obj)
+    if recompute:
+        doc.recompute([i for i in doc.Objects if i not in paths])
+    for obj in paths:
+        obj.purgeTouched()
@@ -118,37 +118,198 @@ def check_interaction(x1, y1, a1, ref_obj):
         
     return ref_obj, x, y, [angle1, angle2], block
 
+# outline of a single beam segment offset by a radius, with rounded ends
+def _segment_outline(x, y, a, length, radius, z):
+    d = App.Vector(cos(a), sin(a), 0)
+    n = App.Vector(-sin(a), cos(a), 0)*radius
+    p1 = App.Vector(x, y, z)
+    p2 = p1+d*length
+    edges = [Part.LineSegment(p1+n, p2+n).toShape(),
+             Part.Arc(p2+n, p2+d*radius, p2-n).toShape(),
+             Part.LineSegment(p2-n, p1-n).toShape(),
+             Part.Arc(p1-n, p1-d*radius, p1+n).toShape()]
+    return Part.Face(Part.Wire(edges))
+
+def beam_channel(beams, width, z_min, z_max):
+    '''
+    Build the channel swept by a set of traced beams, as a single extruded solid
+
+    Each beam segment is offset in 2D, the outlines are merged in one 2D union and the
+    result is extruded once
+
+    Args:
+        beams (list): Beam segments as [x, y, angle, length, ...], as stored by a beam path
+        width (float): The full width of the channel
+        z_min, z_max (float): The bottom and top of the channel
+    '''
+    faces = []
+    for i in beams:
+        length = i[3]
+        if length == 0:
+            length = 50
+        faces.append(_segment_outline(i[0], i[1], i[2], length, width/2, z_min))
+    if len(faces) == 0:
+        return Part.Shape()
+    region = faces[0].multiFuse(faces[1:]).removeSplitter() if len(faces) > 1 else faces[0]
+    return region.extrude(App.Vector(0, 0, z_max-z_min))
+
+# get the geometry of a component which beams should keep clear of
+def _clearance_bodies(obj):
+    from . import optomech
+    bodies = []
+    # optical surfaces are expected to interact with the beam
+    if not (hasattr(obj, "Proxy") and hasattr(obj.Proxy, 'max_angle') and hasattr(obj.Proxy, 'max_width')):
+        if hasattr(obj, "Shape") and not obj.Shape.isNull():
+            bodies.append(("body", obj.Shape, obj.Shape.BoundBox))
+        elif hasattr(obj, "Mesh"):
+            mesh = optomech._mesh(obj)
+            if mesh.CountPoints > 0:
+                bodies.append(("body", mesh, mesh.BoundBox))
+    if hasattr(obj, "DrillPart") and not obj.DrillPart.isNull():
+        bodies.append(("drill", obj.DrillPart, obj.DrillPart.BoundBox))
+    return bodies
+
+# distance from a point to each of the segments a-b
+def _point_segments(p, a, b):
+    d = b-a
+    dd = (d*d).sum(axis=1)
+    t = np.clip(((p-a)*d).sum(axis=1)/np.where(dd > 0, dd, 1), 0, 1)
+    return np.linalg.norm(p-(a+t[:, None]*d), axis=1)
+
+# distance between the segment p1-p2 and each of the segments a-b, clamping the closest points to both
+def _segment_segments(p1, p2, a, b):
+    d1, d2, r = p2-p1, b-a, p1-a
+    aa = d1.dot(d1)
+    bb = (d2*d1).sum(axis=1)
+    c = (r*d1).sum(axis=1)
+    e = (d2*d2).sum(axis=1)
+    f = (d2*r).sum(axis=1)
+    denom = aa*e-bb*bb
+    s = np.where(denom > 1e-12, np.clip((bb*f-c*e)/np.where(denom > 1e-12, denom, 1), 0, 1), 0)
+    t = np.where(e > 1e-12, (bb*s+f)/np.where(e > 1e-12, e, 1), 0)
+    s = np.where(t < 0, np.clip(-c/aa, 0, 1), np.where(t > 1, np.clip((bb-c)/aa, 0, 1), s))
+    t = np.clip(t, 0, 1)
+    return np.linalg.norm(p1+s[:, None]*d1-(a+t[:, None]*d2), axis=1)
+
+# check which points lie inside their triangle, given points already in the triangle's plane
+def _inside(q, a, b, c, n):
+    return ((np.cross(b-a, q-a)*n).sum(axis=1) >= 0) & ((np.cross(c-b, q-b)*n).sum(axis=1) >= 0) & \
+           ((np.cross(a-c, q-c)*n).sum(axis=1) >= 0)
+
+# minimum distance between a line segment and a set of (n, 3, 3) triangles
+def _segment_distance(p1, p2, tris):
+    if len(tris) == 0:
+        return np.inf
+    p1, p2 = np.array(p1), np.array(p2)
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+    n = np.cross(b-a, c-a)
+    valid = (n*n).sum(axis=1) > 1e-24
+
+    # the segment passes through a triangle
+    da, db = ((p1-a)*n).sum(axis=1), ((p2-a)*n).sum(axis=1)
+    t = np.where(da != db, da/np.where(da != db, da-db, 1), 0)
+    hit = valid & (da*db <= 0) & (da != db) & _inside(p1+t[:, None]*(p2-p1), a, b, c, n)
+    if hit.any():
+        return 0.0
+
+    # otherwise the closest points are on an edge of either, or an end of the segment over a face
+    dist = np.minimum.reduce([_segment_segments(p1, p2, u, v) for u, v in [(a, b), (b, c), (c, a)]])
+    unit = n/np.where(valid, np.linalg.norm(n, axis=1), 1)[:, None]
+    for p in [p1, p2]:
+        height = ((p-a)*unit).sum(axis=1)
+        over = valid & _inside(p-height[:, None]*unit, a, b, c, n)
+        dist = np.where(over, np.minimum(dist, np.abs(height)), dist)
+    return float(dist.min())
+
+def check_clearance(path_obj, radius=None, report=True):
+    '''
+    Find component bodies and drill holes which come within a clearance radius of a traced beam
+
+    Args:
+        path_obj (obj): The traced beam path object to check
+        radius (float): The minimum allowed distance, defaults to the ClearanceRadius of the beam path
+        report (bool): Whether to print each near miss to the console
+    '''
+    from . import layout
+    if radius == None:
+        radius = path_obj.ClearanceRadius.Value
+    placement = path_obj.Baseplate.Placement
+    z = placement.Base.z
+    cell = inch
+
+    # bucket each body into the grid cells its bounds cover, skipping anything out of the beam plane
+    bodies = []
+    grid = {}
+    for obj in layout._placed_objects(path_obj.Baseplate):
+        if obj == path_obj or isinstance(getattr(obj, "Proxy", None), beam_path):
+            continue
+        for kind, geometry, bound in _clearance_bodies(obj):
+            if bound.ZMin-radius > z or bound.ZMax+radius < z:
+                continue
+            for ix in range(floor((bound.XMin-radius)/cell), floor((bound.XMax+radius)/cell)+1):
+                for iy in range(floor((bound.YMin-radius)/cell), floor((bound.YMax+radius)/cell)+1):
+                    grid.setdefault((ix, iy), []).append(len(bodies))
+            bodies.append((obj, kind, geometry, bound))
+
+    misses = []
+    facets = {}
+    for x, y, a, length, index, start_ref, end_ref in path_obj.Proxy.beams:
+        if length == 0:
+            length = 50
+        p1 = placement.multVec(App.Vector(x, y, 0))
+        p2 = placement.multVec(App.Vector(x+length*cos(a), y+length*sin(a), 0))
+        skip = set(layout._family(i) for i in [start_ref, end_ref] if i != None)
+
+        candidates = set()
+        for ix in range(floor((min(p1.x, p2.x)-radius)/cell), floor((max(p1.x, p2.x)+radius)/cell)+1):
+            for iy in range(floor((min(p1.y, p2.y)-radius)/cell), floor((max(p1.y, p2.y)+radius)/cell)+1):
+                candidates.update(grid.get((ix, iy), []))
+
+        segment = None
+        for i in sorted(candidates):
+            obj, kind, geometry, bound = bodies[i]
+            if layout._family(obj) in skip:
+                continue
+            if not hasattr(geometry, "distToShape"):
+                # mesh facets are only collected once a beam comes near them
+                if i not in facets:
+                    vertices, indices = geometry.Topology
+                    tris = np.array([tuple(v) for v in vertices])[np.array(indices)]
+                    facets[i] = (tris, tris.min(axis=1), tris.max(axis=1))
+                tris, lower, upper = facets[i]
+                ends = np.array([tuple(p1), tuple(p2)])
+                near = np.all((lower <= ends.max(axis=0)+radius) & (upper >= ends.min(axis=0)-radius), axis=1)
+                dist = _segment_distance(ends[0], ends[1], tris[near])
+            else:
+                if segment == None:
+                    segment = Part.LineSegment(p1, p2).toShape()
+                dist = segment.distToShape(geometry)[0]
+            if dist < radius:
+                misses.append((index, obj, kind, dist))
+
+    if report:
+        for index, obj, kind, dist in misses:
+            App.Console.PrintWarning("%s beam %s passes %.2fmm from %s %s\n"%(path_obj.Label, bin(index), dist, obj.Label, kind))
+    return misses
+
 # beam path freecad object
 class beam_path:
 
-    def __init__(self, obj, drill=True):
+    def __init__(self, obj, drill=True, clearance=0):
 
         obj.Proxy = self
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
+        obj.addProperty('App::PropertyLength', 'ClearanceRadius').ClearanceRadius = clearance
         self.components = [[]]
 
     def __getstate__(self):
         return None
 
-    # TODO clean and implement this for baseplate covers
+    # get the channel swept by the beams, in beam path coordinates
     def _get_drill(self, obj):
-        width = 50
-        part = Part.makeSphere(1)
-        for i in self.beams:
-            length = i[3]
-            if length == 0:
-                length = 50
-            temp = Part.makeBox(length+width, width, 100)
-            for x in temp.Edges:
-                if x.tangentAt(x.FirstParameter) == App.Vector(0, 0, 1):
-                    temp = temp.makeFillet(width/2-1e-3, [x])
-            temp.translate(App.Vector(-width/2, -width/2, -inch/2))
-            temp.rotate(App.Vector(0, 0, 0), App.Vector(0, 0, 1), degrees(i[2]))
-            temp.translate(App.Vector(i[0], i[1], 0))
-            part = part.fuse(temp)
+        part = beam_channel(self.beams, 50, -inch/2, 100-inch/2)
         part.translate(App.Vector(-self.x, -self.y, 0))
         part.rotate(App.Vector(0, 0, 0),App.Vector(0, 0, 1), degrees(-self.a))
-        part = part.fuse(part)
         return part
 
     def execute(self, obj):
@@ -161,8 +322,25 @@ class beam_path:
         self.beams = []
         self.comp_track = []
         self.calculate_beam_path(obj, self.x, self.y, self.a)
+        self._draw_beams(obj)
+
+    def load_beams(self, obj, beams):
+        '''
+        Draw a previously traced set of beams without recalculating the path
 
-        # draw beam
+        Args:
+            obj (obj): The beam path object
+            beams (list): Beam segments as [x, y, angle, length, beam_index]
+        '''
+        self.x, self.y, _ = obj.BasePlacement.Base
+        self.a = obj.BasePlacement.Rotation.Angle
+        self.a *= obj.BasePlacement.Rotation.Axis[2]
+        self.beams = [list(i[:4])+[int(i[4]), None, None] for i in beams]
+        self.comp_track = []
+        self._draw_beams(obj)
+
+    # build the beam shape from the traced segments
+    def _draw_beams(self, obj):
         shapes = []
         for i in self.beams:
             length = i[3]
@@ -177,7 +355,7 @@ class beam_path:
         obj.Shape = comp
 
     # compute full beam path given start point and angle
-    def calculate_beam_path(self, selfobj, x1, y1, a1, beam_index=1):
+    def calculate_beam_path(self, selfobj, x1, y1, a1, beam_index=1, start_ref=None):
         if beam_index > 200:
             return
         
@@ -214,8 +392,10 @@ class beam_path:
                     if pre_count > inline_obj.PreRefs:
                         comp_d -= pre_d # account for previous distance
 
-                    # inline placement
-                    inline_obj.BasePlacement.Base = App.Vector(x1+comp_d*cos(a1), y1+comp_d*sin(a1), 0)
+                    # inline placement, only written when it moves so unchanged components stay clean
+                    inline_pos = App.Vector(x1+comp_d*cos(a1), y1+comp_d*sin(a1), 0)
+                    if inline_obj.BasePlacement.Base != inline_pos:
+                        inline_obj.BasePlacement.Base = inline_pos
 
             # get all valid objects
             check_objs = []
@@ -280,7 +460,7 @@ class beam_path:
                     if len(intersect) > 0 and min_len > min(intersect):
                         min_len = min(intersect)
                         block = True
-                self.beams.append([x1, y1, a1, min_len, beam_index])
+                self.beams.append([x1, y1, a1, min_len, beam_index, start_ref, ref_obj])
             else:
                 # restrict beam to baseplate
                 if selfobj.Baseplate.dx != 0 and selfobj.Baseplate.dy != 0:
@@ -296,7 +476,7 @@ class beam_path:
                         intersect.append(-(x1-0)/cos(a1))
                     if yf < 0:
                         intersect.append(-(y1-0)/sin(a1))
-                    self.beams.append([x1, y1, a1, min(intersect), beam_index])
+                    self.beams.append([x1, y1, a1, min(intersect), beam_index, start_ref, None])
                 return
             
             if block:
@@ -319,18 +499,19 @@ class beam_path:
                                 if comp.BeamIndex>>int(abs(log2(comp.BeamIndex/i[4]))) == i[4]:
                                     comp.BasePlacement.Base = App.Vector(0, 0, 0)
                                     self.comp_track.remove(comp)
-                            self.calculate_beam_path(selfobj, last[0], last[1], last[2], last[4])
+                            self.calculate_beam_path(selfobj, last[0], last[1], last[2], last[4], last[5])
                             break
             
             # compute next beam and handle recursion for beam splits
             if af_arr[0] != None and af_arr[1] != None:
-                self.calculate_beam_path(selfobj, xf, yf, af_arr[0], (beam_index<<1))
+                self.calculate_beam_path(selfobj, xf, yf, af_arr[0], (beam_index<<1), ref_obj)
                 beam_index = (beam_index<<1)+1
                 inline_comps = []
                 for obj in selfobj.PathObjects:
                     if obj.BeamIndex == beam_index:
                         inline_comps.append(obj)
                 comp_index = 0
+            start_ref = ref_obj
             if af_arr[1] != None:
                 x1, y1, a1 = xf, yf, af_arr[1]
                 count += 1
@@ -340,9 +521,18 @@ class beam_path:
             else:
                 return
                     
+# place a beam path relative to its baseplate
+def _place_path(obj):
+    obj.Placement.Base = obj.BasePlacement.Base + obj.Baseplate.Placement.Base
+    obj.Placement = App.Placement(obj.Placement.Base, obj.Baseplate.Placement.Rotation, -obj.BasePlacement.Base)
+    obj.Placement.Rotation = obj.Placement.Rotation.multiply(obj.BasePlacement.Rotation)
+
 class ViewProvider:
 
     def __init__(self, obj):
+        # there are no view objects when running without a GUI
+        if obj == None:
+            return
         obj.Proxy = self
 
     def attach(self, obj):
@@ -353,9 +543,7 @@ class ViewProvider:
     
     def updateData(self, obj, prop):
         if str(prop) == "BasePlacement":
-            obj.Placement.Base = obj.BasePlacement.Base + obj.Baseplate.Placement.Base
-            obj.Placement = App.Placement(obj.Placement.Base, obj.Baseplate.Placement.Rotation, -obj.BasePlacement.Base)
-            obj.Placement.Rotation = obj.Placement.Rotation.multiply(obj.BasePlacement.Rotation)
+            _place_path(obj)
         return
 
     def onDelete(self, feature, subelements):
@@ -2,10 +2,20 @@ import FreeCAD as App
 import Mesh
 import Part
 import Draft
-from . import laser, optomech
+from . import laser, optomech, journal, machining, cache, workers
 from pathlib import Path
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from types import SimpleNamespace
+import importlib
+import inspect
+import sys
+import tempfile
+import numpy as np
 
 inch = 25.4
+parallel_threshold = 4 # fewest components worth starting worker processes for
 
 cardinal = {"right":0,
             "left":180,
@@ -21,14 +31,39 @@ turn = {"up-right":-45,
         "left-down":-45}
 
 def check_bound(obj1, obj2):
-    bound1 = obj1.BoundBox
-    bound2 = obj2.BoundBox
+    bound1 = getattr(obj1, "BoundBox", obj1)
+    bound2 = getattr(obj2, "BoundBox", obj2)
     if bound1.XMin < bound2.XMax and bound2.XMin < bound1.XMax:
         if bound1.YMin < bound2.YMax and bound2.YMin < bound1.YMax:
             if bound1.ZMin < bound2.ZMax and bound2.ZMin < bound1.ZMax:
                 return True
     return False
 
+_batch_depth = 0 # number of nested baseplate batches currently open
+_pending_links = {} # link list additions queued until the outermost batch closes
+
+# append to a link list property, queued if a batch is active
+def _append_link(holder, prop, item):
+    if _batch_depth > 0:
+        key = (holder.Name, prop)
+        if key not in _pending_links:
+            _pending_links[key] = (holder, prop, [])
+        _pending_links[key][2].append(item)
+    else:
+        setattr(holder, prop, getattr(holder, prop)+[item])
+
+# register an object with the child index of its baseplate
+def _index_object(obj):
+    if obj.Baseplate != None and hasattr(obj.Baseplate, "PlacedObjects"):
+        _append_link(obj.Baseplate, "PlacedObjects", obj)
+
+# get all objects placed relative to a baseplate
+def _placed_objects(baseplate_obj):
+    if hasattr(baseplate_obj, "PlacedObjects"):
+        return baseplate_obj.PlacedObjects
+    # fall back to a full scan for documents created before the index existed
+    return [i for i in App.ActiveDocument.Objects if hasattr(i, "BasePlacement") and getattr(i, "Baseplate", None) == baseplate_obj]
+
 class baseplate:
     '''
     A class for defining new baseplates
@@ -44,8 +79,13 @@ class baseplate:
         x_offset, y_offset (float): Additional offset from the grid in the x and y directions
         optics_dz (float): The optical height of baseplate
         invert_label (bool): Wheather to switch the face the label is embossed on
+        instancing (bool): Whether identical mounts should share a single prototype mesh
+        machining_2d (bool): Whether to cut drill holes as layered 2D profiles instead of 3D booleans
+        preview (bool): Whether to display a fast heightmap of the drilled plate, the exact shape is only built for export
+        preview_resolution (float): The grid spacing of the preview heightmap
     '''
-    def __init__(self, dx=0, dy=0, dz=inch, x=0, y=0, angle=0, gap=0, name="Baseplate", drill=True, mount_holes=[], label="", x_offset=0, y_offset=0, optics_dz=inch/2, x_splits=[], y_splits=[], invert_label=False):
+    @journal.recorded
+    def __init__(self, dx=0, dy=0, dz=inch, x=0, y=0, angle=0, gap=0, name="Baseplate", drill=True, mount_holes=[], label="", x_offset=0, y_offset=0, optics_dz=inch/2, x_splits=[], y_splits=[], invert_label=False, instancing=False, machining_2d=False, preview=False, preview_resolution=1):
         obj = App.ActiveDocument.addObject('Part::FeaturePython', name)
         ViewProvider(obj.ViewObject)
         obj.Proxy = self
@@ -63,10 +103,16 @@ class baseplate:
         obj.addProperty('App::PropertyFloatList', 'xSplits').xSplits = x_splits
         obj.addProperty('App::PropertyFloatList', 'ySplits').ySplits = y_splits
         obj.addProperty('App::PropertyLength', 'InvertLabel').InvertLabel = invert_label
+        obj.addProperty('App::PropertyBool', 'Instancing').Instancing = instancing
+        obj.addProperty('App::PropertyBool', 'Machining2D').Machining2D = machining_2d
+        obj.addProperty('App::PropertyBool', 'Preview').Preview = preview
+        obj.addProperty('App::PropertyLength', 'PreviewResolution').PreviewResolution = preview_resolution
+        obj.addProperty("App::PropertyLinkHidden", "PreviewMesh")
 
         obj.Placement = App.Placement(App.Vector(x*inch, y*inch, 0), App.Rotation(angle, 0, 0), App.Vector(0, 0, 0))
         self.active_baseplate = obj.Name
         obj.addProperty("App::PropertyLinkListHidden","ChildObjects")
+        obj.addProperty("App::PropertyLinkListHidden","PlacedObjects")
         for x, y in mount_holes:
             mount = self.place_element("Mount Hole (%d, %d)"%(x, y), optomech.baseplate_mount, (x+0.5)*inch, (y+0.5)*inch, 0)
             obj.ChildObjects += [mount]
@@ -78,6 +124,73 @@ class baseplate:
         baseplate_cover(obj, baseplate, dz=dz)
 
 
+    @contextmanager
+    def batch(self):
+        '''
+        Context manager for placing many elements at once
+        Recomputes and placement updates are deferred and link lists are written once when the block exits
+
+        Usage:
+            with baseplate.batch():
+                baseplate.place_element_along_beam(...)
+        '''
+        global _batch_depth
+        doc = App.ActiveDocument
+        depth = _batch_depth
+        _batch_depth += 1
+        if _batch_depth > 1:
+            try:
+                yield self
+            finally:
+                _batch_depth = depth
+            return
+
+        frozen = getattr(doc, "RecomputesFrozen", None)
+        if frozen != None:
+            doc.RecomputesFrozen = True
+        doc.openTransaction("Place elements")
+        try:
+            yield self
+            self._flush()
+        except:
+            _pending_links.clear()
+            doc.abortTransaction()
+            raise
+        else:
+            doc.commitTransaction()
+        finally:
+            # placement updates must never stay switched off, even if the block or flush failed
+            _batch_depth = depth
+            if frozen != None:
+                doc.RecomputesFrozen = frozen
+
+    def _flush(self):
+        global _batch_depth
+        pending = list(_pending_links.values())
+        _pending_links.clear()
+        for holder, prop, items in pending:
+            setattr(holder, prop, getattr(holder, prop)+items)
+
+        placed = []
+        for holder, prop, items in pending:
+            if prop == "PlacedObjects":
+                placed.extend(items)
+
+        # placement updates were skipped while deferred, so apply angles and propagate once from each tree root
+        roots = []
+        for obj in placed:
+            if hasattr(obj, "RelativeParent"):
+                obj.BasePlacement.Rotation = App.Rotation(App.Vector(0, 0, 1), obj.Angle)
+            elif not hasattr(obj, "ParentObject"):
+                roots.append(obj)
+        _batch_depth -= 1
+        for obj in roots:
+            placement = obj.BasePlacement
+            if hasattr(obj, "Angle"):
+                placement.Rotation = App.Rotation(App.Vector(0, 0, 1), obj.Angle)
+            obj.BasePlacement = placement
+
+    @journal.recorded
     def place_element(self, name, obj_class, x, y, angle, optional=False, **args):
         '''
         Place an element at a fixed coordinate on the baseplate
@@ -103,8 +216,10 @@ class baseplate:
             if hasattr(obj, "ChildObjects"):
                 for child in obj.ChildObjects:
                     child.Proxy.transmission = True
+        _index_object(obj)
         return obj
 
+    @journal.recorded
     def place_element_along_beam(self, name, obj_class, beam_obj, beam_index, angle, distance=None, x=None, y=None, pre_refs=0, optional=False, **args):
         '''
         Place an element at along a given beam path
@@ -124,7 +239,7 @@ class baseplate:
         obj.addProperty("App::PropertyLinkHidden","Baseplate").Baseplate = getattr(App.ActiveDocument, self.active_baseplate)
         obj.Label = name
         obj_class(obj, **args)
-        beam_obj.PathObjects += [obj]
+        _append_link(beam_obj, "PathObjects", obj)
         
         obj.setEditorMode('Placement', 2)
         obj.addProperty("App::PropertyPlacement","BasePlacement")
@@ -143,8 +258,10 @@ class baseplate:
             if hasattr(obj, "ChildObjects"):
                 for child in obj.ChildObjects:
                     child.Proxy.transmission = True
+        _index_object(obj)
         return obj
 
+    @journal.recorded
     def place_element_relative(self, name, obj_class, rel_obj, angle, x_off=0, y_off=0, optional=False, **args):
         '''
         Place an element relative to another object
@@ -169,18 +286,20 @@ class baseplate:
         obj.addProperty("App::PropertyPlacement","RelativePlacement").RelativePlacement
         obj.RelativePlacement.Base = App.Vector(x_off, y_off, 0)
         obj.addProperty("App::PropertyLinkHidden","RelativeParent").RelativeParent = rel_obj
-        if not hasattr(obj, "RelativeObjects"):
+        if not hasattr(rel_obj, "RelativeObjects"):
             rel_obj.addProperty("App::PropertyLinkListChild","RelativeObjects")
-        rel_obj.RelativeObjects += [obj]
+        _append_link(rel_obj, "RelativeObjects", obj)
 
         if optional:
             obj.Proxy.transmission = True
             if hasattr(obj, "ChildObjects"):
                 for child in obj.ChildObjects:
                     child.Proxy.transmission = True
+        _index_object(obj)
         return obj
 
-    def add_beam_path(self, x, y, angle, name="Beam Path", color=(1.0, 0.0, 0.0)):
+    @journal.recorded
+    def add_beam_path(self, x, y, angle, name="Beam Path", color=(1.0, 0.0, 0.0), clearance=0):
         '''
         Add a new dynamic beam path
 
@@ -189,32 +308,27 @@ class baseplate:
             angle (float): The angle the beam should enter at
             name (string): Label for the beam path object
             color (float[3]): Color of the beam path object in RGB format
+            clearance (float): Warn about mount bodies closer than this to the beam on every redraw, zero to disable
         '''
         obj = App.ActiveDocument.addObject('Part::FeaturePython', name)
         obj.Label = name
         laser.ViewProvider(obj.ViewObject)
-        laser.beam_path(obj)
+        laser.beam_path(obj, clearance=clearance)
 
         obj.addProperty("App::PropertyLinkHidden","Baseplate").Baseplate = getattr(App.ActiveDocument, self.active_baseplate) 
         obj.addProperty("App::PropertyPlacement","BasePlacement")
         obj.BasePlacement = App.Placement(App.Vector(x, y, 0), App.Rotation(angle, 0, 0), App.Vector(0, 0, 0))
         obj.addProperty("App::PropertyLinkListHidden","PathObjects").PathObjects
-        obj.ViewObject.ShapeColor = color
+        optomech._set_color(obj, color)
+        _index_object(obj)
         return obj
     
     def execute(self, obj):
         if obj.dx == 0 and obj.dy == 0:
             for i in App.ActiveDocument.Objects:
                 if hasattr(i, "Baseplate") and i.Baseplate == obj:
-                    if hasattr(i, "Shape"):
-                        obj_body = i.Shape.copy()
-                    elif hasattr(i, "Mesh"):
-                        obj_body = i.Mesh.copy()
-                    else:
-                        obj_body = i
-                    if hasattr(obj_body, "BoundBox") and hasattr(i, "BasePlacement"):
-                        obj_body.Placement = i.BasePlacement
-                        bound = obj_body.BoundBox
+                    if (hasattr(i, "Shape") or hasattr(i, "Mesh")) and hasattr(i, "BasePlacement"):
+                        bound = optomech._global_bound(i, i.BasePlacement)
                         obj.xOffset = min(obj.xOffset.Value, bound.XMin-obj.AutosizeTol.Value)
                         obj.yOffset = min(obj.yOffset.Value, bound.YMin-obj.AutosizeTol.Value)
                         obj.dx = max(obj.dx.Value, bound.XMax+obj.AutosizeTol.Value-obj.xOffset.Value)
@@ -223,7 +337,60 @@ class baseplate:
 
         if obj.dx == 0 and obj.dy == 0:
             return
-        
+
+        if getattr(obj, "Preview", False):
+            part = self._build(obj, drill=False)
+            obj.Shape = part
+            self._draw_preview(obj, part.BoundBox)
+        else:
+            obj.Shape = self._build(obj)
+            if getattr(obj, "PreviewMesh", None) != None:
+                obj.PreviewMesh.Mesh = Mesh.Mesh()
+        # the undrilled plate would hide the preview mesh
+        if obj.ViewObject != None:
+            obj.ViewObject.Visibility = not getattr(obj, "Preview", False)
+
+    def exact_shape(self, obj):
+        '''
+        Get the fully drilled plate, even when only a preview is being displayed
+
+        Args:
+            obj (obj): The baseplate object
+        '''
+        if not getattr(obj, "Preview", False):
+            return obj.Shape
+        part = self._build(obj)
+        part.Placement = obj.Placement
+        return part
+
+    # get the drill tools of every component on the plate, in plate coordinates
+    def _drills(self, obj):
+        drills = []
+        for i in App.ActiveDocument.Objects:
+            if hasattr(i, 'DrillPart'):
+                if i.Drill and i.Baseplate == obj:
+                    drill = i.DrillPart.copy()
+                    drill.Placement = obj.Placement.inverse()*drill.Placement
+                    drills.append(drill)
+        return drills
+
+    # show the drilled plate as a heightmap mesh instead of cutting the exact shape
+    def _draw_preview(self, obj, bound):
+        if getattr(obj, "PreviewMesh", None) == None:
+            preview = App.ActiveDocument.addObject("Mesh::Feature", obj.Name+"_Preview")
+            preview.Label = obj.Label + " Preview"
+            obj.PreviewMesh = preview
+            obj.ChildObjects += [preview]
+        drills = self._drills(obj) if obj.Drill else []
+        xs, ys, heights = machining.heightmap(bound, drills, obj.PreviewResolution.Value)
+        mesh = machining.heightmap_mesh(xs, ys, heights, bound.ZMin)
+        mesh.Placement = obj.Placement
+        obj.PreviewMesh.Mesh = mesh
+        if obj.PreviewMesh.ViewObject != None and obj.ViewObject != None:
+            obj.PreviewMesh.ViewObject.ShapeColor = obj.ViewObject.ShapeColor
+
+    # build the plate shape, in plate coordinates
+    def _build(self, obj, drill=True):
         part = Part.makeBox(obj.dx.Value-2*obj.Gap.Value, obj.dy.Value-2*obj.Gap.Value, obj.dz.Value,
                             App.Vector(obj.Gap.Value+obj.xOffset.Value, obj.Gap.Value+obj.yOffset.Value, -obj.dz.Value-obj.OpticsDz.Value))
 
@@ -235,13 +402,13 @@ class baseplate:
             for i in obj.ySplits:
                 part = part.cut(Part.makeBox(obj.dx.Value-2*obj.Gap.Value, 2*obj.Gap.Value, obj.dz.Value, 
                                             App.Vector(obj.Gap.Value+obj.xOffset.Value, i-obj.Gap.Value+obj.yOffset.Value, -obj.dz.Value-obj.OpticsDz.Value)))
-        if obj.Drill:
-            for i in App.ActiveDocument.Objects:
-                if hasattr(i, 'DrillPart'):
-                    if i.Drill and i.Baseplate == obj:
-                        drill = i.DrillPart.copy()
-                        drill.Placement = obj.Placement.inverse()*drill.Placement
-                        part = part.cut(drill)
+        if obj.Drill and drill:
+            drills = self._drills(obj)
+            if getattr(obj, "Machining2D", False):
+                part = machining.machine(part, drills)
+            else:
+                for drill in drills:
+                    part = part.cut(drill)
         if obj.CutLabel != "":
             face = Draft.make_shapestring(obj.CutLabel, str(Path(__file__).parent.resolve()) + "/font/OpenSans-Regular.ttf", 5)
             if obj.InvertLabel:
@@ -254,9 +421,10 @@ class baseplate:
                 text = face.Shape.extrude(App.Vector(0, 0.5, 0))
             part = part.cut(text)
             App.ActiveDocument.removeObject(face.Label)
-        obj.Shape = part.removeSplitter()
+        return part.removeSplitter()
 
 
+@journal.recorded
 def place_element_on_table(name, obj_class, x, y, angle, z=0, **args):
         '''
         Place an element at a fixed coordinate on the baseplate
@@ -320,13 +488,14 @@ class baseplate_cover:
         obj.DrillPart = temp
 
         if obj.Drill:
+            # traced beams are stored in baseplate coordinates, so every path is cut in one channel
+            beams = []
             for i in App.ActiveDocument.Objects:
-                if isinstance(i.Proxy, laser.beam_path) and i.Baseplate == baseplate:
-                    exploded = i.Shape.Solids
-                    for shape in exploded:
-                        drill = optomech._bounding_box(shape, obj.BeamTol.Value, 2, z_tol=True, plate_off=-1)
-                        drill.Placement = i.Placement
-                        part = part.cut(drill)
+                if _is_type(i, laser.beam_path) and i.Baseplate == baseplate:
+                    beams.extend(getattr(i.Proxy, "beams", []))
+            if len(beams) > 0:
+                radius = 0.5+obj.BeamTol.Value
+                part = part.cut(laser.beam_channel(beams, 2*radius, -baseplate.OpticsDz.Value-1, radius))
 
         if baseplate.CutLabel != "":
             face = Draft.make_shapestring(baseplate.CutLabel, str(Path(__file__).parent.resolve()) + "/font/OpenSans-Regular.ttf", 5)
@@ -348,44 +517,510 @@ class table_grid:
     Add an optical table mounting grid
 
     Args:
-        dx, yy (float): The dimentions of the table grid (in inches)
+        dx, dy (int): The number of mounting holes along x and y, the grid is dx*pitch by dy*pitch
         z_off (float): The z offset of the top of the grid surface
+        pitch (float): The spacing between mounting holes
     '''
-    def __init__(self, dx, dy, z_off=-3/2*inch):
+    @journal.recorded
+    def __init__(self, dx, dy, z_off=-3/2*inch, pitch=inch):
         obj = App.ActiveDocument.addObject('Part::FeaturePython', "Table Grid")
-        self.holes = App.ActiveDocument.addObject("Part::Feature", "Holes")
-        obj.addProperty("App::PropertyLinkListChild","ChildObjects").ChildObjects += [self.holes]
+        holes = App.ActiveDocument.addObject("Mesh::Feature", "Holes")
+        obj.addProperty("App::PropertyLinkListChild","ChildObjects").ChildObjects += [holes]
         ViewProvider(obj.ViewObject)
         obj.Proxy = self
-        self.dx = dx
-        self.dy = dy
-        self.z_off = z_off
 
-        obj.ViewObject.ShapeColor = (0.9, 0.9, 0.9)
+        obj.addProperty('App::PropertyInteger', 'dx').dx = dx
+        obj.addProperty('App::PropertyInteger', 'dy').dy = dy
+        obj.addProperty('App::PropertyLength', 'Pitch').Pitch = pitch
+        obj.addProperty('App::PropertyDistance', 'ZOffset').ZOffset = z_off
+
+        optomech._set_color(obj, (0.9, 0.9, 0.9))
+
+    def __getstate__(self):
+        return None
+
+    def __setstate__(self, state):
+        return None
 
     def execute(self, obj):
-        part = Part.makeBox(self.dx*inch, self.dy*inch, inch/4, App.Vector(0, 0, self.z_off-inch/4))
-        holes = []
-        for x in range(self.dx):
-            for y in range(self.dy):
-                for z in [self.z_off+1e-2, self.z_off-inch/4-1e-2]:
-                    holes.append(Part.Circle(App.Vector((x+0.5)*inch, (y+0.5)*inch, z), App.Vector(0, 0, 1), inch/10))
-        temp = Part.makeCompound(holes)
-        self.holes.Shape = temp
+        pitch = obj.Pitch.Value
+        z_off = obj.ZOffset.Value
+        part = Part.makeBox(obj.dx*pitch, obj.dy*pitch, inch/4, App.Vector(0, 0, z_off-inch/4))
+
+        # only push a new hole mesh when the grid itself has changed
+        key = (obj.dx, obj.dy, round(pitch, 6), round(z_off, 6))
+        if getattr(self, "grid_key", None) != key:
+            obj.ChildObjects[0].Mesh = _grid_holes(*key)
+            self.grid_key = key
         obj.Shape = part
-    
+
+
+max_grids = 8 # number of table grid meshes kept before the least recently used are dropped
+
+_grid_cache = OrderedDict()
+
+# build the hole markers for a table grid as a single mesh, cached per grid size
+def _grid_holes(dx, dy, pitch, z_off, segments=12):
+    key = (dx, dy, pitch, z_off)
+    if key in _grid_cache:
+        _grid_cache.move_to_end(key)
+    else:
+        x, y = np.meshgrid((np.arange(dx)+0.5)*pitch, (np.arange(dy)+0.5)*pitch, indexing='ij')
+        centers = np.column_stack((x.ravel(), y.ravel()))
+
+        # one polygonal hole outline as a triangle fan, instanced at every hole center
+        t = np.linspace(0, 2*np.pi, segments, endpoint=False)
+        ring = np.column_stack((np.cos(t), np.sin(t)))*inch/10
+        fan = np.stack((np.zeros_like(ring), ring, np.roll(ring, -1, axis=0)), axis=1)
+        fan = centers[:, None, None, :]+fan[None]
+
+        facets = []
+        for z in [z_off+1e-2, z_off-inch/4-1e-2]:
+            facets.append(np.concatenate((fan, np.full(fan.shape[:-1]+(1,), z)), axis=-1))
+        _grid_cache[key] = Mesh.Mesh(np.concatenate(facets).reshape(-1, 3).tolist())
+        while len(_grid_cache) > max_grids:
+            _grid_cache.popitem(last=False)
+    return _grid_cache[key]
+
+
+_subassembly_cache = {} # objects built for each unique subassembly, keyed by document and parameters
+
+def subassembly(builder):
+    '''
+    Decorator for functions which build a complete module (baseplate, beam path and components)
+
+    The first call with a given set of parameters builds the module as normal. Further
+    calls which only differ in x, y and angle are placed as linked copies of the first
+    build, so each unique module is only computed once. Either way the decorated function
+    returns the list of objects the call added to the document.
+
+    Args:
+        builder (function): A function taking x, y and angle arguments which builds the module
+    '''
+    @wraps(builder)
+    def wrapper(*args, **kwargs):
+        key, placement = _subassembly_key(builder, args, kwargs)
+        existing = set(i.Name for i in App.ActiveDocument.Objects)
+        if key in _subassembly_cache:
+            names, source = _subassembly_cache[key]
+            objs = [App.ActiveDocument.getObject(i) for i in names]
+            if all(i != None for i in objs):
+                _place_subassembly(builder.__name__, objs, placement.multiply(source.inverse()))
+                return [i for i in App.ActiveDocument.Objects if i.Name not in existing]
+            del _subassembly_cache[key]
+
+        builder(*args, **kwargs)
+        added = [i for i in App.ActiveDocument.Objects if i.Name not in existing]
+        _subassembly_cache[key] = ([i.Name for i in added], placement)
+        return added
+    return wrapper
+
+# drop the cached builds of a document, or only those an object belongs to
+def _forget_subassemblies(doc, name=None):
+    for key, (names, _) in list(_subassembly_cache.items()):
+        if key[0] == doc.Name and (name == None or name in names):
+            del _subassembly_cache[key]
+
+# get the cache key of a subassembly call and the placement it was built at
+def _subassembly_key(builder, args, kwargs):
+    bound = inspect.signature(builder).bind(*args, **kwargs)
+    bound.apply_defaults()
+    params = dict(bound.arguments)
+    x, y, angle = params.pop("x", 0), params.pop("y", 0), params.pop("angle", 0)
+    key = (App.ActiveDocument.Name, builder.__module__, builder.__qualname__, repr(sorted(params.items())))
+    return key, App.Placement(App.Vector(x*inch, y*inch, 0), App.Rotation(angle, 0, 0))
+
+# build a module in its own document in a worker process and save it for merging
+def _build_module(job):
+    module, qualname, kwargs, folder, filename = job
+    if folder != None and folder not in sys.path:
+        sys.path.insert(0, folder)
+    doc = App.newDocument("PyOpticModule")
+    App.setActiveDocument(doc.Name)
+    try:
+        builder = importlib.import_module(module)
+        for name in qualname.split("."):
+            builder = getattr(builder, name)
+        builder(**kwargs)
+        redraw(processes=1) # pool workers can't start workers of their own
+        doc.saveAs(filename)
+    finally:
+        App.closeDocument(doc.Name)
+    return filename
+
+@journal.recorded
+def build_parallel(builds, processes=None):
+    '''
+    Build independent modules, such as the baseplates on a table, in parallel worker processes
+
+    Each module is built, traced and drilled in its own headless document, then every
+    finished module is merged into the active document. Repeats of a subassembly are placed
+    as linked copies of its first build, and anything which can't be imported by a worker
+    (such as functions defined in the running script) is built here afterwards
+
+    Args:
+        builds (list): (builder, kwargs) pairs, where builder is a module level function taking x, y and angle
+        processes (int): The number of worker processes, defaults to the number of cores
+    '''
+    jobs = []
+    local = []
+    seen = set()
+    for builder, kwargs in builds:
+        key = None
+        if hasattr(builder, "__wrapped__"):
+            key, placement = _subassembly_key(builder.__wrapped__, (), kwargs)
+        module = sys.modules.get(builder.__module__)
+        path = getattr(module, "__file__", None)
+        if builder.__module__ == "__main__" or path == None or key in _subassembly_cache or (key != None and key in seen):
+            local.append((builder, kwargs))
+            continue
+        seen.add(key)
+        jobs.append(((builder.__module__, builder.__qualname__, kwargs, str(Path(path).parent)), key, placement if key != None else None))
+
+    if len(jobs) < 2 or processes == 1 or workers._find_python() == None:
+        local = builds
+        jobs = []
+
+    if len(jobs) > 0:
+        doc = App.ActiveDocument
+        with tempfile.TemporaryDirectory() as temp:
+            files = [str(Path(temp) / ("module%d.FCStd"%n)) for n in range(len(jobs))]
+            files = list(workers.imap(_build_module, [job+(f,) for (job, _, _), f in zip(jobs, files)], processes))
+            for (_, key, placement), f in zip(jobs, files):
+                existing = set(i.Name for i in doc.Objects)
+                doc.mergeProject(f)
+                merged = [i for i in doc.Objects if i.Name not in existing]
+                _restore_merged(merged)
+                if key != None:
+                    _subassembly_cache[key] = ([i.Name for i in merged], placement)
+
+    for builder, kwargs in local:
+        builder(**kwargs)
+    redraw()
+
+# merged objects only bring their properties, so rebind what their proxies keep in memory and trace
+# the beams again, everything else was already built by the worker and is left as it was merged
+def _restore_merged(objs):
+    paths = []
+    for obj in objs:
+        optomech._forget(obj)
+        if _is_type(obj, baseplate):
+            obj.Proxy.active_baseplate = obj.Name
+        if getattr(getattr(obj, "ViewObject", None), "Proxy", None) != None:
+            obj.ViewObject.Proxy.Object = obj
+        if _is_type(obj, laser.beam_path):
+            obj.touch()
+            paths.append(obj)
+    if len(paths) > 0:
+        App.ActiveDocument.recompute(paths)
+    for obj in objs:
+        obj.purgeTouched()
+
+# place a linked copy of a built subassembly, transformed relative to the original
+@journal.recorded
+def _place_subassembly(name, objs, transform):
+    part = App.ActiveDocument.addObject("App::Part", name)
+    part.Placement = transform
+    for obj in objs:
+        if not obj.Visibility or not (hasattr(obj, "Shape") or hasattr(obj, "Mesh") or obj.isDerivedFrom("App::Link")):
+            continue
+        link = App.ActiveDocument.addObject("App::Link", obj.Name+"_Link")
+        link.setLink(obj)
+        link.LinkTransform = True
+        link.Label = obj.Label
+        part.addObject(link)
+    return part
+
             
+def _is_type(obj, class_type):
+    return hasattr(obj, "Proxy") and isinstance(obj.Proxy, class_type)
+
+def _is_dirty(obj):
+    return "Touched" in obj.State
+
+# recompute only the given objects, skipping any already handled in an earlier stage
+def _recompute_stage(objs, done):
+    objs = [i for i in objs if i.Name not in done]
+    if len(objs) > 0:
+        for i in objs:
+            i.touch()
+        App.ActiveDocument.recompute(objs)
+        done.update(i.Name for i in objs)
+    return objs
+
+# pack a property value so it can be sent to a worker process
+def _pack(value):
+    if isinstance(value, App.Units.Quantity):
+        return ("quantity", value.Value, value.Unit.Signature)
+    if isinstance(value, App.Placement):
+        return ("placement", tuple(value.toMatrix().A))
+    if isinstance(value, App.Vector):
+        return ("vector", tuple(value))
+    if cache._is_plain(value):
+        return ("plain", value)
+    raise TypeError("can't send %s to a worker"%type(value).__name__)
+
+def _unpack(value):
+    if value[0] == "quantity":
+        return App.Units.Quantity(value[1], App.Units.Unit(*value[2]))
+    if value[0] == "placement":
+        return App.Placement(App.Matrix(*value[1]))
+    if value[0] == "vector":
+        return App.Vector(*value[1])
+    return value[1]
+
+# everything a worker needs to run a parametric component's execute without the document
+def _snapshot(obj):
+    cls = type(obj.Proxy)
+    props = {}
+    for prop in obj.PropertiesList:
+        kind = obj.getTypeIdOfProperty(prop)
+        if not kind.startswith("App::PropertyLink") and kind not in cache._skipped_kinds:
+            props[prop] = _pack(getattr(obj, prop))
+    if hasattr(obj, "RelativePlacement"):
+        props["RelativePlacement"] = _pack(optomech._relative_placement(obj))
+    return dict(module=cls.__module__, cls=cls.__qualname__, doc=obj.Document.Name, name=obj.Name, props=props,
+                state={k: v for k, v in vars(obj.Proxy).items() if cache._is_plain(v)},
+                optics_dz=_pack(obj.Baseplate.OpticsDz) if getattr(obj, "Baseplate", None) != None else None,
+                children=_child_snapshots(obj), shapes=cache._shape_props(obj))
+
+# drill parts of the sub-parts an execute may cut into its body
+def _child_snapshots(obj):
+    children = []
+    for child in getattr(obj, "ChildObjects", []):
+        drill = None
+        if hasattr(child, "DrillPart") and not child.DrillPart.isNull():
+            drill = child.DrillPart.exportBrepToString()
+        children.append(dict(drill=drill, has_drill=hasattr(child, "DrillPart"), children=_child_snapshots(child)))
+    return children
+
+def _load_brep(brep):
+    shape = Part.Shape()
+    if brep != None:
+        shape.importBrepFromString(brep)
+    return shape
+
+def _child_stub(child):
+    stub = SimpleNamespace(ChildObjects=[_child_stub(i) for i in child["children"]])
+    if child["has_drill"]:
+        stub.DrillPart = _load_brep(child["drill"])
+    return stub
+
+# build a component from a snapshot in a worker process, returns the BREP of each shape property
+def _build_snapshot(snapshot):
+    try:
+        cls = getattr(importlib.import_module(snapshot["module"]), snapshot["cls"])
+        proxy = cls.__new__(cls)
+        proxy.__dict__.update(snapshot["state"])
+        obj = SimpleNamespace(Name=snapshot["name"], Document=SimpleNamespace(Name=snapshot["doc"]), Proxy=proxy,
+                              ChildObjects=[_child_stub(i) for i in snapshot["children"]])
+        for prop, value in snapshot["props"].items():
+            setattr(obj, prop, _unpack(value))
+        if snapshot["optics_dz"] != None:
+            obj.Baseplate = SimpleNamespace(OpticsDz=_unpack(snapshot["optics_dz"]))
+        execute = getattr(cls.execute, "__wrapped__", cls.execute)
+        execute(proxy, obj)
+        shapes = [getattr(obj, i, Part.Shape()) for i in snapshot["shapes"]]
+        return [None if i.isNull() else i.exportBrepToString() for i in shapes]
+    except Exception:
+        return None
+
+# check if anything below an object is waiting to be recomputed
+def _dirty_below(obj, names):
+    for child in getattr(obj, "ChildObjects", []):
+        if child.Name in names or _dirty_below(child, names):
+            return True
+    return False
+
+# build uncached parametric components in worker processes, anything else is left for the regular recompute
+def _parallel_stage(objs, done, processes=None):
+    names = set(i.Name for i in objs)
+    jobs = []
+    for i in objs:
+        if i.Name in done or not hasattr(i, "Proxy") or not getattr(getattr(i.Proxy, "execute", None), "parametric", False):
+            continue
+        if _dirty_below(i, names):
+            continue
+        try:
+            key = cache.key(i) if cache.enabled else None
+            if key != None and cache.has(key):
+                continue
+            jobs.append((i, key, _snapshot(i)))
+        except Exception:
+            continue
+    if len(jobs) < parallel_threshold or processes == 1 or workers._find_python() == None:
+        return []
+
+    built = []
+    for (obj, key, snapshot), breps in zip(jobs, workers.imap(_build_snapshot, [i[2] for i in jobs], processes)):
+        if breps == None:
+            continue
+        shapes = [_load_brep(i) for i in breps]
+        for prop, shape in zip(snapshot["shapes"], shapes):
+            # outside of a recompute a shape's placement is copied to its object
+            shape.Placement = obj.Placement
+            setattr(obj, prop, shape)
+        obj.purgeTouched()
+        if key != None:
+            cache.store(key, shapes)
+        done.add(obj.Name)
+        built.append(obj)
+    return built
+
+# without a GUI there are no view providers to apply placement changes, so apply them all here
+def _sync_placements(objs):
+    for i in objs:
+        if hasattr(i, "Angle") and hasattr(i, "BasePlacement"):
+            optomech._update_placement(i, "Angle")
+    for i in objs:
+        if _is_type(i, laser.beam_path):
+            laser._place_path(i)
+        elif hasattr(i, "BasePlacement") and hasattr(i, "Baseplate"):
+            optomech._update_placement(i, "BasePlacement")
+
 # Update function for dynamic elements
-def redraw():
-    for class_type in [laser.beam_path, baseplate, baseplate_cover, baseplate]:
-        for i in App.ActiveDocument.Objects:
-            if hasattr(i, "Proxy") and isinstance(i.Proxy, class_type):
-                i.touch()
-        App.ActiveDocument.recompute()
+def redraw(collisions=False, processes=None):
+    '''
+    Redraw all dynamic elements in dependency order, recomputing only what has changed
+
+    Beam paths are traced first since they place inline components, then any
+    components with pending changes, then the baseplates they drill into, then
+    the covers which are cut around both the baseplates and beams and finally
+    the baseplates again for the ledges their covers drill. Beam paths with a clearance
+    radius are then checked against the redrawn components.
+    Parametric components which aren't cached are built in parallel worker processes
+
+    Args:
+        collisions (bool): Whether to check the redrawn baseplates for colliding components
+        processes (int): The number of worker processes for components, defaults to the number of cores
+    '''
+    del optomech.fillet_failures[:]
+    objs = App.ActiveDocument.Objects
+    plates = [i for i in objs if _is_type(i, baseplate)]
+    covers = [i for i in objs if _is_type(i, baseplate_cover)]
+    paths = [i for i in objs if _is_type(i, laser.beam_path)]
+    done = set()
+    if not App.GuiUp:
+        _sync_placements(objs)
+
+    # a beam path needs retracing if anything on its baseplate has changed
+    dirty_plates = set()
+    for i in objs:
+        if _is_dirty(i) and hasattr(i, "Baseplate") and i.Baseplate != None and not _is_type(i, baseplate_cover):
+            dirty_plates.add(i.Baseplate.Name)
+    traced = _recompute_stage([i for i in paths if i.Baseplate.Name in dirty_plates or _is_dirty(i.Baseplate)], done)
+    if not App.GuiUp and len(traced) > 0:
+        _sync_placements(objs)
+
+    # tracing touches every component it moved
+    skip = set(i.Name for i in plates+covers+paths)
+    pending = [i for i in objs if i.Name not in skip and _is_dirty(i)]
+    components = _parallel_stage(pending, done, processes)
+    components += _recompute_stage(pending, done)
+
+    changed = set()
+    for i in traced+components:
+        if hasattr(i, "Baseplate") and i.Baseplate != None:
+            changed.add(i.Baseplate.Name)
+    drilled = _recompute_stage([i for i in plates if i.Name in changed or _is_dirty(i)], done)
+
+    changed.update(i.Name for i in drilled)
+    covered = _recompute_stage([i for i in covers if i.Baseplate.Name in changed or _is_dirty(i)], done)
+
+    # covers are sized from their baseplate but also drill a ledge into it, so drill those plates again
+    redrilled = [i.Baseplate for i in covered if i.Drill]
+    if len(redrilled) > 0:
+        for i in redrilled:
+            i.touch()
+        App.ActiveDocument.recompute(redrilled)
+        # the ledge doesn't depend on the plate's drilling, so the covers are still up to date
+        for i in covered:
+            i.purgeTouched()
+        changed.update(i.Name for i in redrilled)
+
+    # components are only in their final place once every stage is done, so beams are checked last
+    for i in paths:
+        if i.Baseplate.Name in changed and hasattr(i, "ClearanceRadius") and i.ClearanceRadius.Value > 0:
+            laser.check_clearance(i)
+    if collisions:
+        check_collisions([i for i in plates if i.Name in changed])
+
+    info = optomech.primitive_cache_info()
+    App.Console.PrintLog("Primitive cache: %d hits, %d misses (%.0f%% hit rate)\n"%(info["hits"], info["misses"], 100*info["hit_rate"]))
+
+# get the world bounding box of a component from its cached local bounds
+def _world_bound(obj):
+    return optomech._global_bound(obj)
+
+# get the top level component an object belongs to
+def _family(obj):
+    while hasattr(obj, "ParentObject") and obj.ParentObject != None:
+        obj = obj.ParentObject
+    return obj.Name
+
+# get the closed mesh of a component for intersection tests with mesh parts
+def _collision_mesh(obj):
+    if hasattr(obj, "Shape"):
+        return Mesh.Mesh(obj.Shape.tessellate(0.1))
+    return optomech._mesh(obj)
+
+# check whether two components overlap by more than the given volume
+def _overlaps(obj1, obj2, tol):
+    if hasattr(obj1, "Shape") and hasattr(obj2, "Shape"):
+        return obj1.Shape.common(obj2.Shape).Volume > tol
+    return _collision_mesh(obj1).intersect(_collision_mesh(obj2)).Volume > tol
+
+# pairs of items whose boxes overlap, found by sweeping along x and keeping every box whose x range is still open
+def _sweep_pairs(boxes):
+    pairs = []
+    active = []
+    for bound, item in sorted(boxes, key=lambda x: x[0].XMin):
+        active = [i for i in active if i[0].XMax > bound.XMin]
+        for other_bound, other in active:
+            if check_bound(bound, other_bound):
+                pairs.append((other, item))
+        active.append((bound, item))
+    return pairs
+
+def check_collisions(plates=None, tol=1e-3, report=True):
+    '''
+    Find components which physically overlap each other
+
+    Candidate pairs are found with a sweep and prune over the component bounding boxes
+    of each baseplate, and only those pairs are checked for an exact intersection
+
+    Args:
+        plates (obj[]): The baseplates to check, defaults to every baseplate in the document
+        tol (float): The minimum overlapping volume to be reported as a collision
+        report (bool): Whether to print the colliding pairs to the console
+    '''
+    if plates == None:
+        plates = [i for i in App.ActiveDocument.Objects if _is_type(i, baseplate)]
+    collisions = []
+    for plate in plates:
+        comps = []
+        for i in _placed_objects(plate):
+            if _is_type(i, laser.beam_path) or not (hasattr(i, "Shape") or hasattr(i, "Mesh")):
+                continue
+            bound = _world_bound(i)
+            if bound.isValid():
+                comps.append((bound, i))
+        for other, obj in _sweep_pairs(comps):
+            if _family(obj) != _family(other) and _overlaps(obj, other, tol):
+                collisions.append((other, obj))
+
+    if report:
+        for a, b in collisions:
+            App.Console.PrintWarning("%s collides with %s\n"%(a.Label, b.Label))
+    return collisions
 
 def show_components(state):
     for i in App.ActiveDocument.Objects:
         if hasattr(i, "Proxy") and not isinstance(i.Proxy, baseplate):
+            if getattr(i, "InstanceLink", None) != None:
+                i = i.InstanceLink
+            if i.ViewObject == None:
+                continue
             if state:
                 i.ViewObject.show()
             else:
@@ -395,6 +1030,9 @@ def show_components(state):
 class ViewProvider:
 
     def __init__(self, obj):
+        # there are no view objects when running without a GUI
+        if obj == None:
+            return
         obj.Proxy = self
         self.Object = obj.Object
 
@@ -405,11 +1043,15 @@ class ViewProvider:
         return "Shaded"
         
     def updateData(self, base_obj, prop):
-        for obj in App.ActiveDocument.Objects:
-            if hasattr(obj, "BasePlacement") and obj.Baseplate != None:
-                obj.Placement.Base = obj.BasePlacement.Base + obj.Baseplate.Placement.Base
-                obj.Placement = App.Placement(obj.Placement.Base, obj.Baseplate.Placement.Rotation, -obj.BasePlacement.Base)
-                obj.Placement.Rotation = obj.Placement.Rotation.multiply(obj.BasePlacement.Rotation)
+        # only baseplate moves need to be propagated to placed objects
+        if _batch_depth > 0 or str(prop) != "Placement" or not isinstance(base_obj.Proxy, baseplate):
+            return
+        placements = []
+        for obj in _placed_objects(base_obj):
+            placements.append((obj, base_obj.Placement.multiply(obj.BasePlacement)))
+        for obj, placement in placements:
+            if obj.Placement != placement:
+                obj.Placement = placement
 
     def onDelete(self, feature, subelements):
         # delete all elements when baseplate is deleted
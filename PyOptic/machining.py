@@ -0,0 +1,198 @@
+import FreeCAD as App
+import Mesh
+import Part
+import numpy as np
+from math import ceil
+
+tol = 1e-6
+
+# check if a solid only has horizontal and vertical faces, so it can be cut as stacked 2D profiles
+def _is_prismatic(solid):
+    for face in solid.Faces:
+        surface = face.Surface
+        if isinstance(surface, Part.Plane):
+            normal = face.normalAt(0, 0)
+            if abs(abs(normal.z)-1) < tol or abs(normal.z) < tol:
+                continue
+        elif isinstance(surface, Part.Cylinder):
+            if abs(abs(surface.Axis.z)-1) < tol:
+                continue
+        elif isinstance(surface, Part.SurfaceOfExtrusion):
+            if abs(abs(surface.Direction.z)-1) < tol:
+                continue
+        return False
+    return True
+
+# get the heights at which the profile of a prismatic solid changes
+def _levels(solid):
+    levels = set([round(solid.BoundBox.ZMin, 6), round(solid.BoundBox.ZMax, 6)])
+    for face in solid.Faces:
+        if face.BoundBox.ZLength < tol:
+            levels.add(round(face.BoundBox.ZMin, 6))
+    return levels
+
+# get the cross section of a solid at a given height as a face
+def _section(solid, z):
+    wires = solid.slice(App.Vector(0, 0, 1), z)
+    if len(wires) == 0:
+        return None
+    return Part.makeFace(wires, "Part::FaceMakerBullseye")
+
+def machine(stock, tools):
+    '''
+    Cut a set of drill tools from a stock shape using layered 2D profiles
+
+    Prismatic tools (bores, counterbores, pockets with vertical walls) are sliced at every
+    height where a profile changes, merged per layer with 2D booleans and the layers extruded.
+    Any other tools are cut afterwards with regular 3D booleans
+
+    Args:
+        stock (Shape): The prismatic shape to cut from, such as a baseplate box
+        tools (Shape[]): The drill tools to remove, in the same coordinates as the stock
+    '''
+    if not all(_is_prismatic(i) for i in stock.Solids):
+        return stock.cut(tools) if len(tools) > 0 else stock
+
+    prisms = []
+    others = []
+    for tool in tools:
+        for solid in tool.Solids:
+            if _is_prismatic(solid):
+                prisms.append(solid)
+            else:
+                others.append(solid)
+
+    # only the heights inside the stock matter, tools are trimmed to it
+    z_min, z_max = stock.BoundBox.ZMin, stock.BoundBox.ZMax
+    levels = set()
+    for i in stock.Solids+prisms:
+        levels.update(_levels(i))
+    levels = sorted(i for i in levels if z_min-tol < i < z_max+tol)
+
+    layers = []
+    for z1, z2 in zip(levels[:-1], levels[1:]):
+        if z2-z1 < tol:
+            continue
+        mid = (z1+z2)/2
+        profile = _section(stock, mid)
+        if profile == None:
+            continue
+        sections = []
+        for i in prisms:
+            if i.BoundBox.ZMin < mid < i.BoundBox.ZMax:
+                section = _section(i, mid)
+                if section != None:
+                    sections.append(section)
+        if len(sections) > 0:
+            cut = sections[0].multiFuse(sections[1:]) if len(sections) > 1 else sections[0]
+            profile = profile.cut(cut)
+        if len(profile.Faces) == 0:
+            continue
+        profile.translate(App.Vector(0, 0, z1-mid))
+        layers.append(profile.extrude(App.Vector(0, 0, z2-z1)))
+
+    if len(layers) == 0:
+        return Part.Shape()
+    part = layers[0].multiFuse(layers[1:]) if len(layers) > 1 else layers[0]
+    part = part.removeSplitter()
+    if len(others) > 0:
+        part = part.cut(others)
+    return part
+
+# z-buffer the lowest and highest surface of a set of (n, 3, 3) triangles over the grid cells they cover,
+# returns the window of the grid they cover along with the surfaces in it, or None if they cover nothing
+def _rasterize(xs, ys, tris, chunk=2**20):
+    (x1, y1, z1), (x2, y2, z2), (x3, y3, z3) = tris.transpose(1, 2, 0)
+    det = (y2-y3)*(x1-x3)+(x3-x2)*(y1-y3)
+    i0, i1 = np.searchsorted(xs, tris[:, :, 0].min(axis=1)), np.searchsorted(xs, tris[:, :, 0].max(axis=1), side="right")
+    j0, j1 = np.searchsorted(ys, tris[:, :, 1].min(axis=1)), np.searchsorted(ys, tris[:, :, 1].max(axis=1), side="right")
+    # vertical walls don't change the depth
+    keep = (np.abs(det) >= tol) & (i1 > i0) & (j1 > j0)
+    if not keep.any():
+        return None
+    x1, y1, z1, x2, y2, z2, x3, y3, z3, det, i0, i1, j0, j1 = [i[keep] for i in [x1, y1, z1, x2, y2, z2, x3, y3, z3, det, i0, i1, j0, j1]]
+
+    wi, wj = i0.min(), j0.min()
+    low = np.full((i1.max()-wi, j1.max()-wj), np.inf)
+    high = np.full(low.shape, -np.inf)
+    rows = j1-j0
+    counts = (i1-i0)*rows
+    ends = np.cumsum(counts)
+
+    # every (triangle, cell) pair is evaluated at once, in chunks to bound the memory used
+    first = 0
+    while first < len(counts):
+        last = max(first+1, np.searchsorted(ends, ends[first]-counts[first]+chunk, side="right"))
+        tri = np.repeat(np.arange(first, last), counts[first:last])
+        offset = np.arange(len(tri))-np.repeat(ends[first:last]-counts[first:last]-(ends[first]-counts[first]), counts[first:last])
+        gi = i0[tri]+offset//rows[tri]
+        gj = j0[tri]+offset%rows[tri]
+        gx, gy = xs[gi], ys[gj]
+        a = ((y2[tri]-y3[tri])*(gx-x3[tri])+(x3[tri]-x2[tri])*(gy-y3[tri]))/det[tri]
+        b = ((y3[tri]-y1[tri])*(gx-x3[tri])+(x1[tri]-x3[tri])*(gy-y3[tri]))/det[tri]
+        c = 1-a-b
+        inside = (a >= -tol) & (b >= -tol) & (c >= -tol)
+        z = (a*z1[tri]+b*z2[tri]+c*z3[tri])[inside]
+        cells = ((gi-wi)*low.shape[1]+gj-wj)[inside]
+        np.minimum.at(low.reshape(-1), cells, z)
+        np.maximum.at(high.reshape(-1), cells, z)
+        first = last
+    return wi, wj, low, high
+
+def heightmap(bound, tools, resolution):
+    '''
+    Rasterize the depth of a set of drill tools into a grid of material heights
+
+    A heightmap can only hold material cut from above, so each tool only removes material
+    down to its lowest surface in the cells where it also reaches the top face of the stock.
+    Pockets and counterbores which don't break the top face are left as solid material
+
+    Args:
+        bound (BoundBox): The bounds of the stock, its top face is the starting height
+        tools (Shape[]): The drill tools to remove, in the same coordinates as the bounds
+        resolution (float): The spacing of the grid
+    '''
+    xs = np.linspace(bound.XMin, bound.XMax, max(2, int(ceil(bound.XLength/resolution))+1))
+    ys = np.linspace(bound.YMin, bound.YMax, max(2, int(ceil(bound.YLength/resolution))+1))
+    heights = np.full((len(xs), len(ys)), float(bound.ZMax))
+
+    for tool in tools:
+        if tool.BoundBox.ZMin >= bound.ZMax or tool.isNull():
+            continue
+        points, facets = tool.tessellate(resolution)
+        if len(facets) == 0:
+            continue
+        points = np.array([tuple(i) for i in points])
+        raster = _rasterize(xs, ys, points[np.array(facets)])
+        if raster == None:
+            continue
+
+        # only the columns where the tool is open to the top face are carved
+        i, j, low, high = raster
+        window = heights[i:i+low.shape[0], j:j+low.shape[1]]
+        opened = high >= bound.ZMax-tol
+        window[opened] = np.minimum(window[opened], low[opened])
+
+    return xs, ys, np.maximum(heights, bound.ZMin)
+
+def heightmap_mesh(xs, ys, heights, z_min):
+    '''
+    Build a preview mesh from a heightmap, leaving holes where the material is cut through
+
+    Args:
+        xs, ys (float[]): The grid coordinates of the heightmap
+        heights (float[][]): The material height at each grid point
+        z_min (float): The bottom of the stock
+    '''
+    gx, gy = np.meshgrid(xs, ys, indexing='ij')
+    vertices = np.stack((gx, gy, heights), axis=-1).reshape(-1, 3)
+    index = np.arange(len(xs)*len(ys)).reshape(len(xs), len(ys))
+    a, b, c, d = index[:-1, :-1], index[1:, :-1], index[1:, 1:], index[:-1, 1:]
+    tris = np.concatenate((np.stack((a, b, c), axis=-1).reshape(-1, 3), np.stack((a, c, d), axis=-1).reshape(-1, 3)))
+    through = heights.ravel() <= z_min+tol
+    tris = tris[~through[tris].any(axis=1)]
+
+    corners = np.array([[xs[0], ys[0]], [xs[-1], ys[0]], [xs[-1], ys[-1]], [xs[0], ys[-1]]])
+    corners = np.column_stack((corners, np.full(4, z_min)))
+    bottom = corners[np.array([[0, 2, 1], [0, 3, 2]])]
+    return Mesh.Mesh(np.concatenate((vertices[tris], bottom)).reshape(-1, 3).tolist())
@@ -2,8 +2,9 @@ import FreeCAD as App
 import Mesh
 import Part
 from math import *
-from . import layout
+from . import layout, cache, stl_index
 import numpy as np
+from collections import OrderedDict
 
 from pathlib import Path
 
@@ -38,33 +39,153 @@ mount_color = (0.5, 0.5, 0.55)
 glass_color = (0.5, 0.5, 0.8)
 misc_color = (0.2, 0.2, 0.2)
 
+# set the display color of an object, also kept on the proxy so it's known without a GUI
+def _set_color(obj, color):
+    obj.Proxy.color = color
+    if obj.ViewObject != None:
+        obj.ViewObject.ShapeColor = color
+
+_stl_cache = {}
+
 # Used to tranform an STL such that it's placement matches the optical center
+# returns the mesh along with its local bounds from the library index, which are only valid for the untouched mesh
 def _import_stl(stl_name, rotate, translate, scale=1):
-    mesh = Mesh.read(stl_path+stl_name)
-    mat = App.Matrix()
-    mat.scale(App.Vector(scale, scale, scale))
-    mesh.transform(mat)
-    mesh.rotate(*np.deg2rad(rotate))
-    mesh.translate(*translate)
-    return mesh
+    key = (stl_name, tuple(rotate), tuple(translate), scale)
+    if key not in _stl_cache:
+        mesh = Mesh.read(stl_path+stl_name)
+        mat = App.Matrix()
+        mat.scale(App.Vector(scale, scale, scale))
+        mesh.transform(mat)
+        mesh.rotate(*np.deg2rad(rotate))
+        mesh.translate(*translate)
+        _stl_cache[key] = mesh
+    return _stl_cache[key].copy(), _indexed_bound(key)
+
+_stl_bounds = {}
+
+# local bounds of an imported STL from the library index, so they never need the mesh vertices
+def _indexed_bound(key):
+    if key not in _stl_bounds:
+        try:
+            _stl_bounds[key] = App.BoundBox(*stl_index.info(*key)["bound"])
+        except (OSError, ValueError):
+            _stl_bounds[key] = None
+    return _stl_bounds[key]
+
+# check if an object should share its mesh with identical parts
+def _is_instanced(obj):
+    baseplate = getattr(obj, "Baseplate", None)
+    return baseplate != None and getattr(baseplate, "Instancing", False)
+
+_prototype_index = {} # prototype names by document and mesh key
+
+# find or create the prototype object holding the shared geometry for a mesh
+def _get_prototype(obj, mesh):
+    bound = mesh.BoundBox
+    key = "%s %d %d %.4f %.4f %.4f %.4f %.4f %.4f %.4f"%(type(obj.Proxy).__name__, mesh.CountPoints, mesh.CountFacets,
+                                                        bound.XMin, bound.YMin, bound.ZMin, bound.XMax, bound.YMax, bound.ZMax, mesh.Area)
+    doc = App.ActiveDocument
+    if doc.Name not in _prototype_index:
+        # prototypes saved with the document are indexed the first time it's used
+        _prototype_index[doc.Name] = {i.PrototypeKey: i.Name for i in doc.Objects if hasattr(i, "PrototypeKey")}
+    proto = doc.getObject(_prototype_index[doc.Name].get(key, ""))
+    if proto != None and getattr(proto, "PrototypeKey", None) == key:
+        return proto
+    proto = doc.addObject("Mesh::Feature", "Prototype")
+    proto.addProperty("App::PropertyString", "PrototypeKey").PrototypeKey = key
+    _prototype_index[doc.Name][key] = proto.Name
+    proto.Label = type(obj.Proxy).__name__ + " Prototype"
+    proto.Mesh = mesh
+    proto.Visibility = False
+    if obj.ViewObject != None:
+        proto.ViewObject.ShapeColor = obj.ViewObject.ShapeColor
+    return proto
+
+# assign a newly computed mesh, sharing it through a prototype when instancing is enabled
+# bound is the mesh's known local bounds, if given they're used instead of reading its vertices
+def _set_mesh(obj, mesh, bound=None):
+    if not _is_instanced(obj):
+        mesh.Placement = obj.Mesh.Placement
+        obj.Mesh = mesh
+        # assigning the mesh dropped the old bounds, so the known ones go in after it
+        if bound != None:
+            _local_bounds[(obj.Document.Name, obj.Name)] = bound
+        return
+    proto = _get_prototype(obj, mesh)
+    if not hasattr(obj, "Prototype"):
+        obj.addProperty("App::PropertyLinkHidden", "Prototype")
+        obj.addProperty("App::PropertyLinkHidden", "InstanceLink")
+    if obj.InstanceLink == None:
+        obj.InstanceLink = App.ActiveDocument.addObject("App::Link", obj.Name+"_Instance")
+        obj.InstanceLink.Label = obj.Label
+    if bound != None:
+        _local_bounds[(proto.Document.Name, proto.Name)] = bound
+    if obj.Prototype != proto:
+        obj.Prototype = proto
+        obj.InstanceLink.setLink(proto)
+    obj.InstanceLink.Placement = obj.Placement
+    if obj.Mesh.CountFacets > 0:
+        obj.Mesh = Mesh.Mesh()
+
+_local_bounds = {} # bounds of each object's geometry without its placement, keyed by document and name until it changes
+
+# bounds of a mesh's vertices in its own frame, undoing its placement
+def _vertex_bound(mesh):
+    if mesh.CountPoints == 0:
+        return App.BoundBox()
+    points = np.array([tuple(i) for i in mesh.Topology[0]])
+    mat = np.array(mesh.Placement.inverse().toMatrix().A).reshape(4, 4)
+    points = points @ mat[:3, :3].T + mat[:3, 3]
+    return App.BoundBox(*[float(i) for i in points.min(axis=0)], *[float(i) for i in points.max(axis=0)])
+
+# get the bounds of an object's geometry in its local frame, without copying the geometry
+def _local_bound(obj):
+    if hasattr(obj, "Shape"):
+        key = (obj.Document.Name, obj.Name)
+        if key not in _local_bounds:
+            # the shape returned by a property shares its geometry, only this handle's placement changes
+            shape = obj.Shape
+            shape.Placement = App.Placement()
+            _local_bounds[key] = shape.BoundBox
+        return _local_bounds[key]
+    # instances share the bounds of their prototype
+    source = obj.Prototype if getattr(obj, "Prototype", None) != None else obj
+    key = (source.Document.Name, source.Name)
+    if key not in _local_bounds:
+        _local_bounds[key] = _vertex_bound(source.Mesh)
+    return _local_bounds[key]
+
+# bounds of a box after a placement, from its eight transformed corners
+def _transform_bound(bound, placement):
+    result = App.BoundBox()
+    for x in [bound.XMin, bound.XMax]:
+        for y in [bound.YMin, bound.YMax]:
+            for z in [bound.ZMin, bound.ZMax]:
+                result.add(placement.multVec(App.Vector(x, y, z)))
+    return result
+
+# get the bounds of an object in its current placement, or another given placement
+def _global_bound(obj, placement=None):
+    if placement == None:
+        placement = obj.Placement
+    return _transform_bound(_local_bound(obj), placement)
+
+# get the mesh of an object in its current placement, whether it's instanced or not
+def _mesh(obj):
+    if getattr(obj, "Prototype", None) != None:
+        mesh = obj.Prototype.Mesh.copy()
+        mesh.Placement = obj.Placement
+        return mesh
+    return obj.Mesh
 
 def _bounding_box(obj, tol, fillet, x_tol=True, y_tol=True, z_tol=False, min_offset=(0, 0, 0), max_offset=(0, 0, 0), plate_off=0):
-    if hasattr(obj, "Shape"):
-        obj_body = obj.Shape.copy()
-    elif hasattr(obj, "Mesh"):
-        obj_body = obj.Mesh.copy()
+    if hasattr(obj, "Shape") or hasattr(obj, "Mesh"):
+        bound = _local_bound(obj)
     else:
-        obj_body = obj
-    obj_body.Placement = App.Placement()
+        bound = obj.BoundBox
+    global_bound = bound
     if hasattr(obj, "RelativePlacement"):
-        obj_body.Placement = obj.RelativePlacement
-        temp = obj
-        while hasattr(temp, "ParentObject") and hasattr(temp.ParentObject, "RelativePlacement"):
-            temp = temp.ParentObject
-            obj_body.Placement *= temp.RelativePlacement
-    global_bound = obj_body.BoundBox
-    obj_body.Placement = App.Placement()
-    bound = obj_body.BoundBox
+        global_bound = _transform_bound(bound, _relative_placement(obj))
 
     x_min, x_max = bound.XMin-tol*x_tol+min_offset[0], bound.XMax+tol*x_tol+max_offset[0]
     y_min, y_max = bound.YMin-tol*y_tol+min_offset[1], bound.YMax+tol*y_tol+max_offset[1]
@@ -75,6 +196,80 @@ def _bounding_box(obj, tol, fillet, x_tol=True, y_tol=True, z_tol=False, min_off
                     fillet=fillet, fillet_dir=(0, 0, 1))
     return bound_part
 
+_relative_cache = {}
+
+# composed relative placement of an object up its parent chain, cached until a relative placement changes
+def _relative_placement(obj):
+    key = (obj.Document.Name, obj.Name)
+    if key not in _relative_cache:
+        placement = obj.RelativePlacement
+        temp = obj
+        while hasattr(temp, "ParentObject") and hasattr(temp.ParentObject, "RelativePlacement"):
+            temp = temp.ParentObject
+            placement *= temp.RelativePlacement
+        _relative_cache[key] = placement
+    return App.Placement(_relative_cache[key])
+
+def _invalidate_relative(obj):
+    _relative_cache.pop((obj.Document.Name, obj.Name), None)
+    if hasattr(obj, "ChildObjects"):
+        for child in obj.ChildObjects:
+            _invalidate_relative(child)
+
+# drop everything cached under an object's name, names are reused when a document is rebuilt
+def _forget(obj):
+    _relative_cache.pop((obj.Document.Name, obj.Name), None)
+    _local_bounds.pop((obj.Document.Name, obj.Name), None)
+    prototypes = _prototype_index.get(obj.Document.Name, {})
+    if prototypes.get(getattr(obj, "PrototypeKey", None)) == obj.Name:
+        del prototypes[obj.PrototypeKey]
+    layout._forget_subassemblies(obj.Document, obj.Name)
+
+# drop everything cached for a document
+def _forget_document(doc):
+    for key in [i for i in _relative_cache if i[0] == doc.Name]:
+        del _relative_cache[key]
+    for key in [i for i in _local_bounds if i[0] == doc.Name]:
+        del _local_bounds[key]
+    _prototype_index.pop(doc.Name, None)
+    layout._forget_subassemblies(doc)
+
+class _CacheObserver:
+    '''
+    Keeps the name keyed caches in step with the documents, including without a GUI
+    '''
+    def slotChangedObject(self, obj, prop):
+        if prop == "RelativePlacement":
+            _invalidate_relative(obj)
+        elif prop in ["Shape", "Mesh"]:
+            _local_bounds.pop((obj.Document.Name, obj.Name), None)
+
+    def slotDeletedObject(self, obj):
+        _forget(obj)
+
+    def slotDeletedDocument(self, doc):
+        _forget_document(doc)
+
+# reloading the module replaces the observer rather than adding another
+if "_observer" in globals():
+    App.removeDocumentObserver(_observer)
+_observer = _CacheObserver()
+App.addDocumentObserver(_observer)
+
+# compose the base placements of every object below obj in the transform tree
+def _compose_children(obj, base, placements):
+    if hasattr(obj, "ChildObjects"):
+        for child in obj.ChildObjects:
+            placement = base.multiply(child.RelativePlacement)
+            placements.append((child, placement))
+            _compose_children(child, placement, placements)
+    if hasattr(obj, "RelativeObjects"):
+        for child in obj.RelativeObjects:
+            placement = App.Placement(base.Base+child.RelativePlacement.Base, child.BasePlacement.Rotation)
+            placements.append((child, placement))
+            _compose_children(child, placement, placements)
+    return placements
+
 def _add_linked_object(obj, obj_name, obj_class, pos_offset=(0, 0, 0), rot_offset=(0, 0, 0), **args):
     new_obj = App.ActiveDocument.addObject(obj_class.type, obj_name)
     new_obj.addProperty("App::PropertyLinkHidden","Baseplate").Baseplate = obj.Baseplate
@@ -92,6 +287,7 @@ def _add_linked_object(obj, obj_name, obj_class, pos_offset=(0, 0, 0), rot_offse
     rotz = App.Rotation(App.Vector(0,0,1), rot_offset[2])
     new_obj.RelativePlacement.Rotation = App.Rotation(rotz*roty*rotx)
     new_obj.RelativePlacement.Base = App.Vector(*pos_offset)
+    layout._index_object(new_obj)
     return new_obj
 
 def _drill_part(part, obj, drill_obj):
@@ -104,38 +300,124 @@ def _drill_part(part, obj, drill_obj):
             part = _drill_part(part, obj, sub)
     return part
 
+max_primitives = 512 # number of primitives kept before the least recently used are dropped
+
+_primitive_cache = OrderedDict() # untranslated boxes, cylinders and filleted parts along with their failed fillets, keyed by their arguments
+_primitive_stats = {"hits": 0, "misses": 0}
+
+# get a cached primitive, building it on the first request
+# fillets which failed while building it are reported again every time it's reused
+def _primitive(key, build):
+    if key in _primitive_cache:
+        _primitive_stats["hits"] += 1
+        _primitive_cache.move_to_end(key)
+        for radius, point in _primitive_cache[key][1]:
+            _fillet_failed(radius, point)
+    else:
+        _primitive_stats["misses"] += 1
+        start = len(fillet_failures)
+        part = build()
+        _primitive_cache[key] = (part, fillet_failures[start:])
+        while len(_primitive_cache) > max_primitives:
+            _primitive_cache.popitem(last=False)
+    return _primitive_cache[key][0]
+
+def primitive_cache_info():
+    '''
+    Get the number of hits, misses and cached entries of the primitive cache, along with the hit rate
+    '''
+    total = _primitive_stats["hits"]+_primitive_stats["misses"]
+    return dict(_primitive_stats, entries=len(_primitive_cache), hit_rate=_primitive_stats["hits"]/total if total > 0 else 0)
+
+def clear_primitive_cache():
+    '''
+    Remove every cached primitive and reset the hit counters
+    '''
+    _primitive_cache.clear()
+    _primitive_stats.update(hits=0, misses=0)
+
+fillet_failures = [] # (radius, edge midpoint) of every fillet which couldn't be applied in the latest redraw
+
+def _fillet_failed(radius, point):
+    fillet_failures.append((radius, point))
+    App.Console.PrintWarning("Couldn't fillet edge at %s with radius %.3f\n"%(str(point), radius))
+
+def _midpoint(edge):
+    return edge.valueAt((edge.FirstParameter+edge.LastParameter)/2)
+
+# find edges of an earlier version of a part on the filleted part, by their position
+def _match_edges(part, edges):
+    matched = []
+    for edge in edges:
+        mid = _midpoint(edge)
+        for i in part.Edges:
+            if i.isSame(edge) or (_midpoint(i)-mid).Length < 1e-6:
+                matched.append(i)
+                break
+    return matched
+
+# fillet a set of edges in one operation, only splitting them into smaller batches if that fails
+def _fillet_batch(part, radius, edges):
+    if len(edges) == 0:
+        return part
+    try:
+        return part.makeFillet(radius, edges)
+    except Exception:
+        if len(edges) == 1:
+            _fillet_failed(radius, _midpoint(edges[0]))
+            return part
+    half = len(edges)//2
+    filleted = _fillet_batch(part, radius, edges[:half])
+    return _fillet_batch(filleted, radius, _match_edges(filleted, edges[half:]))
+
+# fillet every edge of a part which runs along dir
+def _fillet_edges(part, radius, dir):
+    return _fillet_batch(part, radius, [i for i in part.Edges if i.tangentAt(i.FirstParameter) == App.Vector(*dir)])
+
+# copy of a cached primitive with the offset applied to its geometry, so callers can still set a placement
+def _translated(part, x, y, z):
+    mat = App.Matrix()
+    mat.move(App.Vector(x, y, z))
+    return part.transformed(mat, True)
+
+def _build_box(dx, dy, dz, fillet, dir, fillet_dir):
+    part = Part.makeBox(dx, dy, dz)
+    if fillet != 0:
+        part = _fillet_edges(part, fillet-1e-3, fillet_dir)
+    part.translate(App.Vector(-(1-dir[0])*dx/2, -(1-dir[1])*dy/2, -(1-dir[2])*dz/2))
+    return part.fuse(part)
+
 def _custom_box(dx, dy, dz, x, y, z, fillet=0, dir=(0,0,1), fillet_dir=None):
     if fillet_dir == None:
         fillet_dir = np.abs(dir)
-    part = Part.makeBox(dx, dy, dz)
-    if fillet != 0:
-        for i in part.Edges:
-            if i.tangentAt(i.FirstParameter) == App.Vector(*fillet_dir):
-                part = part.makeFillet(fillet-1e-3, [i])
-    part.translate(App.Vector(x-(1-dir[0])*dx/2, y-(1-dir[1])*dy/2, z-(1-dir[2])*dz/2))
-    part = part.fuse(part)
-    return part
+    dir = tuple(float(i) for i in dir)
+    fillet_dir = tuple(float(i) for i in fillet_dir)
+    key = ("box", dx, dy, dz, fillet, dir, fillet_dir)
+    part = _primitive(key, lambda: _build_box(dx, dy, dz, fillet, dir, fillet_dir))
+    return _translated(part, x, y, z)
 
 def _fillet_all(part, fillet, dir=(0, 0, 1)):
-    for i in part.Edges:
-        if i.tangentAt(i.FirstParameter) == App.Vector(*dir):
-            try:
-                part = part.makeFillet(fillet-1e-3, [i])
-            except:
-                pass
-    return part
+    # instances of a component fillet identical drill outlines, which are built from boxes and so
+    # are told apart by their corners and topology without serializing the shape
+    corners = tuple(sorted(tuple(round(i, 6) for i in v.Point) for v in part.Vertexes))
+    key = ("fillet", corners, len(part.Edges), len(part.Faces), fillet, tuple(dir))
+    return _primitive(key, lambda: _fillet_edges(part, fillet-1e-3, dir)).copy()
 
-def _custom_cylinder(dia, dz, x, y, z, head_dia=0, head_dz=0, dir=(0, 0, -1), countersink=False):
+def _build_cylinder(dia, dz, head_dia, head_dz, dir, countersink):
     part = Part.makeCylinder(dia/2, dz, App.Vector(0, 0, 0), App.Vector(*dir))
     if head_dia != 0 and head_dz != 0:
         if countersink:
             part = part.fuse(Part.makeCone(head_dia/2, dia/2, head_dz, App.Vector(0, 0, 0), App.Vector(*dir)))
         else:
             part = part.fuse(Part.makeCylinder(head_dia/2, head_dz, App.Vector(0, 0, 0), App.Vector(*dir)))
-    part.translate(App.Vector(x, y, z))
     part = part.fuse(part)
     return part.removeSplitter()
 
+def _custom_cylinder(dia, dz, x, y, z, head_dia=0, head_dz=0, dir=(0, 0, -1), countersink=False):
+    dir = tuple(float(i) for i in dir)
+    key = ("cylinder", dia, dz, head_dia, head_dz, dir, bool(countersink))
+    part = _primitive(key, lambda: _build_cylinder(dia, dz, head_dia, head_dz, dir, countersink))
+    return _translated(part, x, y, z)
 
 class example_component:
     '''
@@ -157,7 +439,7 @@ class example_component:
         obj.addProperty('App::PropertyLength', 'Side_Length').Side_Length = side_len
 
         # additional parameters (ie color, constants, etc)
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
         self.mount_bolt = bolt_8_32
         self.mount_dz = -obj.Baseplate.OpticsDz.Value
 
@@ -196,8 +478,9 @@ class baseplate_mount:
         obj.addProperty('App::PropertyLength', 'BoreDepth').BoreDepth = bore_depth
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
 
+    @cache.cached
     def execute(self, obj):
         bolt_len = inch-(obj.BoreDepth.Value-bolt_14_20['head_dz'])
 
@@ -234,10 +517,11 @@ class surface_adapter:
         obj.addProperty('App::PropertyLength', 'OuterThickness').OuterThickness = outer_thickness
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
         obj.setEditorMode('Placement', 2)
         self.drill_tolerance = 1
 
+    @cache.cached
     def execute(self, obj):
         dx = bolt_8_32['head_dia']+obj.OuterThickness.Value*2
         dy = dx+obj.MountHoleDistance.Value
@@ -288,9 +572,10 @@ class skate_mount:
         obj.addProperty('App::PropertyLength', 'CubeTolerance').CubeTolerance = cube_tol
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
         obj.setEditorMode('Placement', 2)
 
+    @cache.cached
     def execute(self, obj):
         dx = bolt_8_32['head_dia']+obj.OuterThickness.Value*2
         dy = dx+obj.MountHoleDistance.Value
@@ -342,9 +627,10 @@ class slide_mount:
         obj.addProperty('App::PropertyLength', 'OuterThickness').OuterThickness = outer_thickness
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
         
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
         obj.setEditorMode('Placement', 2)
 
+    @cache.cached
     def execute(self, obj):
         dx = bolt_8_32['head_dia']+obj.OuterThickness.Value*2
         dy = dx+obj.SlotLength.Value+obj.PostThickness.Value
@@ -383,15 +669,14 @@ class fiberport_mount_hca3:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['HCA3', 'PAF2-5A']
         self.max_angle = 0
         self.max_width = 1
 
     def execute(self, obj):
-        mesh = _import_stl("HCA3-Step.stl", (90, -0, 90), (-6.35, 19.05, -26.87))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("HCA3-Step.stl", (90, -0, 90), (-6.35, 19.05, -26.87))
+        _set_mesh(obj, mesh, bound)
 
         part = Part.Shape()
         for i in [-1, 0, 1]:
@@ -421,15 +706,14 @@ class rotation_stage_rsp05:
 
         obj.addProperty('App::PropertyBool', 'Invert').Invert = invert
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['RSP05']
 
         _add_linked_object(obj, "Surface Adapter", surface_adapter, pos_offset=(1.397, 0, -13.97), rot_offset=(0, 0, 90*obj.Invert), **adapter_args)
 
     def execute(self, obj):
-        mesh = _import_stl("RSP05-Step.stl", (90, -0, 90), (2.032, -0, 0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("RSP05-Step.stl", (90, -0, 90), (2.032, -0, 0))
+        _set_mesh(obj, mesh, bound)
 
 
 class mirror_mount_k05s2:
@@ -450,7 +734,7 @@ class mirror_mount_k05s2:
         obj.addProperty('App::PropertyBool', 'ThumbScrews').ThumbScrews = thumbscrews
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['POLARIS-K05S2']
 
         if thumbscrews:
@@ -458,9 +742,8 @@ class mirror_mount_k05s2:
             _add_linked_object(obj, "Lower Thumbscrew", thumbscrew_hkts_5_64, pos_offset=(-15.03, -8.89, -8.89))
 
     def execute(self, obj):
-        mesh = _import_stl("POLARIS-K05S2-Step.stl", (90, -0, -90), (-4.514, 0.254, -0.254))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("POLARIS-K05S2-Step.stl", (90, -0, -90), (-4.514, 0.254, -0.254))
+        _set_mesh(obj, mesh, bound)
 
         part = _custom_cylinder(dia=bolt_8_32['tap_dia'], dz=drill_depth,
                                 x=-8.017, y=0, z=-layout.inch/2)
@@ -489,7 +772,7 @@ class mirror_mount_k05s1:
         obj.addProperty('App::PropertyBool', 'ThumbScrews').ThumbScrews = thumbscrews
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['POLARIS-K05S1']
 
         if thumbscrews:
@@ -497,9 +780,8 @@ class mirror_mount_k05s1:
             _add_linked_object(obj, "Lower Thumbscrew", thumbscrew_hkts_5_64, pos_offset=(-11.22, -8.89, -8.89))
 
     def execute(self, obj):
-        mesh = _import_stl("POLARIS-K05S1-Step.stl", (90, 0, -90), (-4.514, 0.254, -0.254))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("POLARIS-K05S1-Step.stl", (90, 0, -90), (-4.514, 0.254, -0.254))
+        _set_mesh(obj, mesh, bound)
 
         part = _custom_cylinder(dia=bolt_8_32['tap_dia'], dz=drill_depth,
                                 x=-8.017, y=0, z=-layout.inch/2)
@@ -529,13 +811,12 @@ class splitter_mount_b05g:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['POLARIS-B05G']
 
     def execute(self, obj):
-        mesh = _import_stl("POLARIS-B05G-Step.stl", (90, -0, 90), (-17.54, -5.313, -19.26))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("POLARIS-B05G-Step.stl", (90, -0, 90), (-17.54, -5.313, -19.26))
+        _set_mesh(obj, mesh, bound)
 
         part = _custom_cylinder(dia=bolt_8_32['tap_dia'], dz=drill_depth,
                                 x=-5, y=0, z=-layout.inch/2)
@@ -565,13 +846,12 @@ class mirror_mount_c05g:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['POLARIS-C05G']
 
     def execute(self, obj):
-        mesh = _import_stl("POLARIS-C05G-Step.stl", (90, -0, 90), (-18.94, -4.246, -15.2))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("POLARIS-C05G-Step.stl", (90, -0, 90), (-18.94, -4.246, -15.2))
+        _set_mesh(obj, mesh, bound)
 
         part = _custom_cylinder(dia=bolt_8_32['tap_dia'], dz=drill_depth,
                                 x=-6.35, y=0, z=-layout.inch/2)
@@ -605,7 +885,7 @@ class mirror_mount_km05:
         obj.addProperty('App::PropertyLength', 'BoltLength').BoltLength = bolt_length
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['KM05']
 
         if thumbscrews:
@@ -613,9 +893,8 @@ class mirror_mount_km05:
             _add_linked_object(obj, "Lower Thumbscrew", thumbscrew_hkts_5_64, pos_offset=(-10.54, -9.906, -9.906))
 
     def execute(self, obj):
-        mesh = _import_stl("KM05-Step.stl", (90, -0, 90), (2.084, -1.148, 0.498))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("KM05-Step.stl", (90, -0, 90), (2.084, -1.148, 0.498))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 2, 3, min_offset=(4.35, 0, 0))
         part = part.fuse(_bounding_box(obj, 2, 3, max_offset=(0, -20, 0)))
@@ -644,7 +923,7 @@ class prism_mount_km05pm:
         obj.addProperty('App::PropertyLength', 'BoltLength').BoltLength = bolt_length
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['KM05PM']
 
         if thumbscrews:
@@ -653,9 +932,8 @@ class prism_mount_km05pm:
 
     def execute(self, obj):
         #mesh = _import_stl("KM05PM-Step.stl", (90, 0, 90), (-12.39, -0.894, 1.514))
-        mesh = _import_stl("KM05PM-Step-No-Plate.stl", (90, -0, 90), (-6.425, -4.069, 6.086))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("KM05PM-Step-No-Plate.stl", (90, -0, 90), (-6.425, -4.069, 6.086))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 3, 3, min_offset=(4.35, 0, 0))
         part = part.fuse(_bounding_box(obj, 3, 3, max_offset=(0, -20, 0)))
@@ -688,7 +966,7 @@ class grating_mount_on_km05pm:
 
         obj.addProperty('App::PropertyAngle', 'LittrowAngle').LittrowAngle = littrow_angle
 
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
         self.dx = 12/tan(radians(2*obj.LittrowAngle))
 
         gap = 10
@@ -705,6 +983,7 @@ class grating_mount_on_km05pm:
         _add_linked_object(obj, "Grating", square_grating, pos_offset=(grating_dx, 0, 0), rot_offset=(0, 0, 180-obj.LittrowAngle.Value), **grating_args)
         _add_linked_object(obj, "Mirror", square_mirror, pos_offset=(mirror_dx, gap, 0), rot_offset=(0, 0, -obj.LittrowAngle.Value), **mirror_args)
 
+    @cache.cached
     def execute(self, obj):
         extra_y = 2
         gap = 10
@@ -752,13 +1031,12 @@ class mount_tsd_405sluu:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['TSD-405SLUU']
 
     def execute(self, obj):
-        mesh = _import_stl("TSD-405SLUU.stl", (0, 0, -90), (-19, 0, -62))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("TSD-405SLUU.stl", (0, 0, -90), (-19, 0, -62))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 3, 3)
         for x, y in [(-34.88, 15.88), (-34.88, -15.88), (-3.125, 15.88), (-3.125, -15.88)]:
@@ -787,15 +1065,14 @@ class mirror_mount_ks1t:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['KM1T']
 
     def execute(self, obj):
-        mesh = _import_stl("KS1T-Step.stl", (90, -0, -90), (22.06, 13.37, -30.35))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("KS1T-Step.stl", (90, -0, -90), (22.06, 13.37, -30.35))
+        _set_mesh(obj, mesh, bound)
 
-        dz = -inch-obj.Mesh.BoundBox.ZMin
+        dz = -inch-_global_bound(obj).ZMin
         part = _bounding_box(obj, 3, 3, min_offset=(0, 0, dz))
         part = part.fuse(_bounding_box(obj, 3, 3, z_tol=True, max_offset=(-28, 0, 0)))
         part = part.fuse(_custom_cylinder(dia=bolt_8_32['tap_dia'], dz=drill_depth,
@@ -825,7 +1102,7 @@ class fiberport_mount_km05:
 
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
 
         _add_linked_object(obj, "Mount", mirror_mount_km05, pos_offset=(0, 0, 0), **mount_args)
         _add_linked_object(obj, "Fiber Adapter", fiber_adapter_sm05fca2, pos_offset=(1.524, 0, 0))
@@ -855,7 +1132,7 @@ class fiberport_mount_ks1t:
 
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
 
         _add_linked_object(obj, "Mount", mirror_mount_ks1t, pos_offset=(0, 0, 0), **mount_args)
         _add_linked_object(obj, "Fiber Adapter", fiber_adapter_sm1fca2, pos_offset=(-3, 0, 0))
@@ -885,7 +1162,7 @@ class km05_50mm_laser:
 
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('App::PropertyLength', 'TecThickness').TecThickness = tec_thickness
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         
         self.part_numbers = [] # TODO add part numbers
         self.max_angle = 0
@@ -912,7 +1189,7 @@ class km05_tec_upper_plate:
         obj.addProperty('App::PropertyLength', 'Thickness').Thickness = thickness
         obj.addProperty('App::PropertyLinkHidden', 'DrillObject').DrillObject = drill_obj
 
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
 
     def execute(self, obj):
         part = _custom_box(dx=obj.Width.Value, dy=obj.Width.Value, dz=obj.Thickness.Value,
@@ -932,8 +1209,9 @@ class km05_tec_lower_plate:
         obj.addProperty('App::PropertyLength', 'Thickness').Thickness = thickness
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
 
+    @cache.cached
     def execute(self, obj):
         part = _custom_box(dx=obj.Width.Value, dy=obj.Width.Value, dz=obj.Thickness.Value,
                                      x=0, y=0, z=-inch/2, dir=(0, 0, -1))
@@ -970,16 +1248,15 @@ class mirror_mount_mk05:
 
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['MK05']
         self.reflection_angle = 0
         self.max_angle = 90
         self.max_width = inch/2
 
     def execute(self, obj):
-        mesh = _import_stl("MK05-Step.stl", (90, -0, -90), (-22.91-obj.ChildObjects[0].Thickness.Value, 26, -5.629))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("MK05-Step.stl", (90, -0, -90), (-22.91-obj.ChildObjects[0].Thickness.Value, 26, -5.629))
+        _set_mesh(obj, mesh, bound)
 
         part = _custom_cylinder(dia=bolt_4_40['tap_dia'], dz=drill_depth,
                            head_dia=bolt_4_40['head_dia'], head_dz=drill_depth-10,
@@ -1003,16 +1280,15 @@ class mount_mk05pm:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['MK05PM']
 
     def execute(self, obj):
-        mesh = _import_stl("MK05PM-Step.stl", (180, 90, 0), (-7.675, 7.699, 4.493))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("MK05PM-Step.stl", (180, 90, 0), (-7.675, 7.699, 4.493))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 2, 2)
-        part = part.cut(_custom_box(dx=4, dy=15, dz=-layout.inch/2-obj.Mesh.BoundBox.ZMin,
+        part = part.cut(_custom_box(dx=4, dy=15, dz=-layout.inch/2-_global_bound(obj).ZMin,
                                     x=part.BoundBox.XMin, y=part.BoundBox.YMax, z=part.BoundBox.ZMin,
                                     dir=(1, -1, 1), fillet=2))
         part = _fillet_all(part, 2)
@@ -1041,19 +1317,18 @@ class dichoric_mirror_mount_km05fl:
 
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['KM05fl']
         self.reflection_angle = 0
         self.max_angle = 90
         self.max_width = inch/2
 
     def execute(self, obj):
-        mesh = _import_stl("KM05FL-Step.stl", (-180, 0, -90), (-11.53, -10.16, -10.16))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("KM05FL-Step.stl", (-180, 0, -90), (-11.53, -10.16, -10.16))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 2, 2)
-        part = part.cut(_custom_box(dx=4, dy=15, dz=-layout.inch/2-obj.Mesh.BoundBox.ZMin,
+        part = part.cut(_custom_box(dx=4, dy=15, dz=-layout.inch/2-_global_bound(obj).ZMin,
                                     x=part.BoundBox.XMin, y=part.BoundBox.YMax, z=part.BoundBox.ZMin,
                                     dir=(1, -1, 1), fillet=2))
         part = _fillet_all(part, 2)
@@ -1083,19 +1358,18 @@ class dichoric_mirror_mount_km05fR:
 
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['KM05fR']
         self.reflection_angle = 0
         self.max_angle = 90
         self.max_width = inch/2
 
     def execute(self, obj):
-        mesh = _import_stl("KM05FR_M-Step.stl", (-90, 0, 0), (-11.53, -10.16, -10.16))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("KM05FR_M-Step.stl", (-90, 0, 0), (-11.53, -10.16, -10.16))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 2, 2)
-        part = part.cut(_custom_box(dx=4, dy=15, dz=-layout.inch/2-obj.Mesh.BoundBox.ZMin,
+        part = part.cut(_custom_box(dx=4, dy=15, dz=-layout.inch/2-_global_bound(obj).ZMin,
                                     x=part.BoundBox.XMin, y=part.BoundBox.YMax, z=part.BoundBox.ZMin,
                                     dir=(1, -1, 1), fillet=2))
         part = _fillet_all(part, 2)
@@ -1126,13 +1400,14 @@ class grating_mount_on_mk05pm:
 
         obj.addProperty('App::PropertyAngle', 'LittrowAngle').LittrowAngle = littrow_angle
 
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
         self.dx = 12/tan(radians(2*obj.LittrowAngle))
 
         _add_linked_object(obj, "Mount MK05PM", mount_mk05pm, pos_offset=(-12, -4, -4-12.7/2+2), **mount_args)
         _add_linked_object(obj, "Grating", square_grating, pos_offset=(0, 0, 2), rot_offset=(0, 0, -obj.LittrowAngle.Value), **grating_args)
         _add_linked_object(obj, "Mirror", square_mirror, pos_offset=(self.dx, -12, 2), rot_offset=(0, 0, -obj.LittrowAngle.Value+180), **mirror_args)
 
+    @cache.cached
     def execute(self, obj):
         # TODO add some variables to make this cleaner
         part = _custom_box(dx=25+self.dx, dy=35, dz=4,
@@ -1177,13 +1452,12 @@ class lens_holder_l05g:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['POLARIS-L05G']
 
     def execute(self, obj):
-        mesh = _import_stl("POLARIS-L05G-Step.stl", (90, -0, 90), (-26.57, -13.29, -18.44))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("POLARIS-L05G-Step.stl", (90, -0, 90), (-26.57, -13.29, -18.44))
+        _set_mesh(obj, mesh, bound)
 
         part = _custom_cylinder(dia=bolt_8_32['tap_dia'], dz=drill_depth,
                                 x=-8, y=0, z=-layout.inch/2)
@@ -1214,7 +1488,7 @@ class pinhole_ida12:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['IDA12-P5']
         self.transmission = True
         self.max_angle = 90
@@ -1226,10 +1500,8 @@ class pinhole_ida12:
                            pos_offset=(1.956, -12.83, 0), **adapter_args)
 
     def execute(self, obj):
-        mesh = _import_stl("IDA12-P5-Step.stl", (90, 0, -90), (1.549, 0, -0))
-        mesh.rotate(-pi/2, 0, 0)
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("IDA12-P5-Step.stl", (0, -90, 0), (1.549, 0, 0))
+        _set_mesh(obj, mesh, bound)
 
         part = _custom_box(dx=6.5, dy=15+obj.ChildObjects[0].SlotLength.Value, dz=1,
                            x=1.956, y=0, z=-layout.inch/2,
@@ -1253,13 +1525,12 @@ class prism_mount_km100pm:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['KM100PM']
 
     def execute(self, obj):
-        mesh = _import_stl("KM100PM-Step.stl", (90, -0, -90), (-8.877, 38.1, -6.731))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("KM100PM-Step.stl", (90, -0, -90), (-8.877, 38.1, -6.731))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 3, 4, max_offset=(-18, -38, 0), z_tol=True)
         part = part.fuse(_bounding_box(obj, 3, 4, min_offset=(17, 0, 0.63)))
@@ -1299,9 +1570,10 @@ class mount_for_km100pm:
         obj.addProperty('App::PropertyLength', 'StageLength').StageLength = stage_length
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
         obj.setEditorMode('Placement', 2)
 
+    @cache.cached
     def execute(self, obj):
         dx = obj.ArmThickness.Value
         dy = 47.5
@@ -1357,7 +1629,7 @@ class isomet_1205c_on_km100pm:
         obj.addProperty('App::PropertyInteger', 'ForwardDirection').ForwardDirection = forward_direction
         obj.addProperty('App::PropertyInteger', 'BackwardDirection').BackwardDirection = backward_direction
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['ISOMET_1205C']
         self.diffraction_angle = diffraction_angle
         self.diffraction_dir = (forward_direction, backward_direction)
@@ -1372,9 +1644,8 @@ class isomet_1205c_on_km100pm:
                            pos_offset=(-15.25, -20.15, -17.50), **adapter_args)
 
     def execute(self, obj):
-        mesh = _import_stl("isomet_1205c.stl", (0, 0, 90), (0, 0, 0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("isomet_1205c.stl", (0, 0, 90), (0, 0, 0))
+        _set_mesh(obj, mesh, bound)
 
 
 class isolator_670:
@@ -1396,7 +1667,7 @@ class isolator_670:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['IOT-5-670-VLP']
         self.transmission = True
         self.max_angle = 10
@@ -1406,9 +1677,8 @@ class isolator_670:
                            pos_offset=(0, 0, -22.1), **adapter_args)
 
     def execute(self, obj):
-        mesh = _import_stl("IOT-5-670-VLP-Step.stl", (90, 0, -90), (-19.05, -0, 0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("IOT-5-670-VLP-Step.stl", (90, 0, -90), (-19.05, -0, 0))
+        _set_mesh(obj, mesh, bound)
 
         part = _custom_box(dx=80, dy=25, dz=5,
                            x=0, y= 0, z=-layout.inch/2,
@@ -1436,7 +1706,7 @@ class isolator_405:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['IO-3D-405-PBS']
         self.transmission = True
         self.max_angle = 10
@@ -1446,9 +1716,8 @@ class isolator_405:
                            pos_offset=(0, 0, -17.15), **adapter_args)
 
     def execute(self, obj):
-        mesh = _import_stl("IO-3D-405-PBS-Step.stl", (90, 0, -90), (-9.461, 0, 0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("IO-3D-405-PBS-Step.stl", (90, 0, -90), (-9.461, 0, 0))
+        _set_mesh(obj, mesh, bound)
 
         part = _custom_box(dx=25, dy=15, dz=drill_depth,
                            x=0, y=0, z=-layout.inch/2,
@@ -1472,15 +1741,14 @@ class rb_cell:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
         self.transmission = True
         self.max_angle = 10
         self.max_width = 1
 
     def execute(self, obj):
-        mesh = _import_stl("rb_cell_holder_middle.stl", (0, 0, 0), ([0, 5, 0]))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("rb_cell_holder_middle.stl", (0, 0, 0), ([0, 5, 0]))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 6, 3)
         dx = 90
@@ -1511,11 +1779,12 @@ class rb_cell_new:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
         self.transmission = True
         self.max_angle = 10
         self.max_width = 1
 
+    @cache.cached
     def execute(self, obj):
         cell_dx = 88
         cell_dia = 25
@@ -1590,7 +1859,7 @@ class photodetector_pda10a2:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['PDA10A2']
         self.max_angle = 80
         self.max_width = 5
@@ -1599,9 +1868,8 @@ class photodetector_pda10a2:
         _add_linked_object(obj, "Lens Tube", lens_tube_SM1L03, pos_offset=(-0.124, 0, -0))
 
     def execute(self, obj):
-        mesh = _import_stl("PDA10A2-Step.stl", (90, 0, -90), (-19.87, -0, -0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("PDA10A2-Step.stl", (90, 0, -90), (-19.87, -0, -0))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 3, 4)
         part.Placement = obj.Placement
@@ -1620,15 +1888,14 @@ class lens_tube_SM1L03:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['SM1L03']
         self.max_angle = 0
         self.max_width = 1
 
     def execute(self, obj):
-        mesh = _import_stl("SM1L03-Step.stl", (90, -0, 0), (8.382, 0, 0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("SM1L03-Step.stl", (90, -0, 0), (8.382, 0, 0))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 2, 3, z_tol=True, min_offset=(0, 4, 0), max_offset=(0, -4, 0))
         part.Placement = obj.Placement
@@ -1659,7 +1926,7 @@ class periscope:
         obj.addProperty('App::PropertyLength', 'UpperHeight').UpperHeight = upper_dz
         obj.addProperty('App::PropertyBool', 'Invert').Invert = invert
 
-        obj.ViewObject.ShapeColor = adapter_color
+        _set_color(obj, adapter_color)
         if obj.Baseplate == None:
             self.z_off = -layout.inch*3/2
         else:
@@ -1668,6 +1935,7 @@ class periscope:
         _add_linked_object(obj, "Lower Mirror", circular_mirror, rot_offset=((-1)**invert*90, -45, 0), pos_offset=(0, 0, obj.LowerHeight.Value+self.z_off), **mirror_args)
         _add_linked_object(obj, "Upper Mirror", circular_mirror, rot_offset=((-1)**invert*90, 135, 0), pos_offset=(0, 0, obj.UpperHeight.Value+self.z_off), **mirror_args)
 
+    @cache.cached
     def execute(self, obj):
         width = 2*inch #Must be inch wide to keep periscope mirrors 1 inch from mount holes. 
         fillet = 15
@@ -1704,13 +1972,12 @@ class thumbscrew_hkts_5_64:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['HKTS-5/64(P4)']
 
     def execute(self, obj):
-        mesh = _import_stl("HKTS-5_64-Step.stl", (90, 0, 90), (-11.31, -0.945, 0.568))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("HKTS-5_64-Step.stl", (90, 0, 90), (-11.31, -0.945, 0.568))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 2, 3, z_tol=True, min_offset=(-6, 0, 0), max_offset=(-6, 0, 0))
         part.Placement = obj.Placement
@@ -1725,15 +1992,14 @@ class fiber_adapter_sm05fca2:
         obj.Proxy = self
         ViewProvider(obj.ViewObject)
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['SM05FCA2']
         self.max_angle = 0
         self.max_width = 1
 
     def execute(self, obj):
-        mesh = _import_stl("SM05FCA2-Step.stl", (0, 90, 0), (-2.334, -3.643, -0.435))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("SM05FCA2-Step.stl", (0, 90, 0), (-2.334, -3.643, -0.435))
+        _set_mesh(obj, mesh, bound)
 
 
 class fiber_adapter_sm1fca2:
@@ -1745,15 +2011,14 @@ class fiber_adapter_sm1fca2:
         obj.Proxy = self
         ViewProvider(obj.ViewObject)
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['SM1FCA2']
         self.max_angle = 0
         self.max_width = 1
 
     def execute(self, obj):
-        mesh = _import_stl("SM1FCA2-Step.stl", (-180, 90, 0), (-12.47, -0.312, 15.41))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("SM1FCA2-Step.stl", (-180, 90, 0), (-12.47, -0.312, 15.41))
+        _set_mesh(obj, mesh, bound)
 
 
 class lens_adapter_s05tm09:
@@ -1765,13 +2030,12 @@ class lens_adapter_s05tm09:
         obj.Proxy = self
         ViewProvider(obj.ViewObject)
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['S05TM09']
 
     def execute(self, obj):
-        mesh =  _import_stl("S05TM09-Step.stl", (90, 0, -90), (6.973, 0, -0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("S05TM09-Step.stl", (90, 0, -90), (6.973, 0, -0))
+        _set_mesh(obj, mesh, bound)
 
 
 class lens_adapter_s1tm09:
@@ -1783,13 +2047,12 @@ class lens_adapter_s1tm09:
         obj.Proxy = self
         ViewProvider(obj.ViewObject)
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['S1TM09']
 
     def execute(self, obj):
-        mesh =  _import_stl("S1TM09-Step.stl", (90, 0, 90), (-3.492, 0, 0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("S1TM09-Step.stl", (90, 0, 90), (-3.492, 0, 0))
+        _set_mesh(obj, mesh, bound)
 
 
 class lens_tube_sm05l05:
@@ -1801,13 +2064,12 @@ class lens_tube_sm05l05:
         obj.Proxy = self
         ViewProvider(obj.ViewObject)
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['SM05L05']
 
     def execute(self, obj):
-        mesh = _import_stl("SM05L05-Step.stl", (90, 0, -90), (0, 0, -0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("SM05L05-Step.stl", (90, 0, -90), (0, 0, -0))
+        _set_mesh(obj, mesh, bound)
 
 
 class lens_tube_sm1l05:
@@ -1822,13 +2084,12 @@ class lens_tube_sm1l05:
         obj.addProperty('App::PropertyBool', 'Drill').Drill = drill
         obj.addProperty('Part::PropertyPartShape', 'DrillPart')
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['SM1L05']
 
     def execute(self, obj):
-        mesh = _import_stl("SM1L05-Step.stl", (90, -0, 0), (13.46, 0, 0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("SM1L05-Step.stl", (90, -0, 0), (13.46, 0, 0))
+        _set_mesh(obj, mesh, bound)
 
         part = _bounding_box(obj, 2, 3, z_tol=True)
         part.Placement = obj.Placement
@@ -1844,13 +2105,12 @@ class mounted_lens_c220tmda:
         obj.Proxy = self
         ViewProvider(obj.ViewObject)
 
-        obj.ViewObject.ShapeColor = glass_color
+        _set_color(obj, glass_color)
         self.part_numbers = ['C220TMD-A']
 
     def execute(self, obj):
-        mesh = _import_stl("C220TMD-A-Step.stl", (-90, 0, -180), (0.419, 0, 0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("C220TMD-A-Step.stl", (-90, 0, -180), (0.419, 0, 0))
+        _set_mesh(obj, mesh, bound)
 
 
 class diode_adapter_s05lm56:
@@ -1862,13 +2122,12 @@ class diode_adapter_s05lm56:
         obj.Proxy = self
         ViewProvider(obj.ViewObject)
 
-        obj.ViewObject.ShapeColor = misc_color
+        _set_color(obj, misc_color)
         self.part_numbers = ['S05LM56']
 
     def execute(self, obj):
-        mesh = _import_stl("S05LM56-Step.stl", (90, 0, -90), (0, 0, -0))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("S05LM56-Step.stl", (90, 0, -90), (0, 0, -0))
+        _set_mesh(obj, mesh, bound)
 
 #Nishat's Edited
 class Room_temp_chamber:
@@ -1886,13 +2145,12 @@ class Room_temp_chamber:
         obj.Proxy = self
         ViewProvider(obj.ViewObject)
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['Room_temp_chamber']
 
     def execute(self, obj):
-        mesh = _import_stl("Room_temp_chamber_step.stl", (0, 0, 0), (-48.89, 1.266, 0.813))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("Room_temp_chamber_step.stl", (0, 0, 0), (-48.89, 1.266, 0.813))
+        _set_mesh(obj, mesh, bound)
 
 
 class Room_temp_chamber_Mechanical:
@@ -1910,13 +2168,12 @@ class Room_temp_chamber_Mechanical:
         obj.Proxy = self
         ViewProvider(obj.ViewObject)
 
-        obj.ViewObject.ShapeColor = mount_color
+        _set_color(obj, mount_color)
         self.part_numbers = ['Room_temp_chamber']
 
     def execute(self, obj):
-        mesh = _import_stl("Room Temp Chamber Mechanical.stl", (0, 0, 0), (-33.46, -10.12, -59.69))
-        mesh.Placement = obj.Mesh.Placement
-        obj.Mesh = mesh
+        mesh, bound = _import_stl("Room Temp Chamber Mechanical.stl", (0, 0, 0), (-33.46, -10.12, -59.69))
+        _set_mesh(obj, mesh, bound)
 
 
 
@@ -1941,7 +2198,7 @@ class square_grating:
         obj.addProperty('App::PropertyLength', 'Width').Width = width
         obj.addProperty('App::PropertyLength', 'Height').Height = height
 
-        obj.ViewObject.ShapeColor = glass_color
+        _set_color(obj, glass_color)
         self.part_numbers = [part_number]
         self.reflection_angle = 0
         self.max_angle = 90
@@ -1975,8 +2232,9 @@ class circular_splitter:
         if mount_type != None:
             _add_linked_object(obj, "Mount", mount_type, pos_offset=(-thickness, 0, 0), **mount_args)
 
-        obj.ViewObject.ShapeColor = glass_color
-        obj.ViewObject.Transparency=50
+        _set_color(obj, glass_color)
+        if obj.ViewObject != None:
+            obj.ViewObject.Transparency=50
         self.part_numbers = [part_number]
         self.transmission = True
         self.reflection_angle = 0
@@ -2006,8 +2264,9 @@ class cube_splitter:
         obj.addProperty('App::PropertyLength', 'CubeSize').CubeSize = cube_size
         obj.addProperty('App::PropertyBool', 'Invert').Invert = invert
 
-        obj.ViewObject.ShapeColor = glass_color
-        obj.ViewObject.Transparency=50
+        _set_color(obj, glass_color)
+        if obj.ViewObject != None:
+            obj.ViewObject.Transparency=50
         self.part_numbers = [cube_part_number]
         
         if invert:
@@ -2055,8 +2314,9 @@ class circular_lens:
         if mount_type != None:
             _add_linked_object(obj, "Mount", mount_type, pos_offset=(-thickness/2, 0, 0), **mount_args)
 
-        obj.ViewObject.ShapeColor = glass_color
-        obj.ViewObject.Transparency=50
+        _set_color(obj, glass_color)
+        if obj.ViewObject != None:
+            obj.ViewObject.Transparency=50
         self.part_numbers = [part_number]
         self.transmission = True
         self.focal_length = obj.FocalLength.Value
@@ -2091,8 +2351,9 @@ class waveplate:
         if mount_type != None:
             _add_linked_object(obj, "Mount", mount_type, pos_offset=(-thickness/2, 0, 0), **mount_args)
 
-        obj.ViewObject.ShapeColor = glass_color
-        obj.ViewObject.Transparency=50
+        _set_color(obj, glass_color)
+        if obj.ViewObject != None:
+            obj.ViewObject.Transparency=50
         self.part_numbers = [part_number]
         self.transmission = True
         self.max_angle = 90
@@ -2126,7 +2387,7 @@ class circular_mirror:
         if mount_type != None:
             _add_linked_object(obj, "Mount", mount_type, pos_offset=(-thickness, 0, 0), **mount_args)
 
-        obj.ViewObject.ShapeColor = glass_color
+        _set_color(obj, glass_color)
         self.part_numbers = [part_number]
         self.reflection_angle = 0
         self.max_angle = 90
@@ -2159,7 +2420,7 @@ class square_mirror:
         obj.addProperty('App::PropertyLength', 'Width').Width = width
         obj.addProperty('App::PropertyLength', 'Height').Height = height
 
-        obj.ViewObject.ShapeColor = glass_color
+        _set_color(obj, glass_color)
         self.part_numbers = [part_number]
         self.reflection_angle = 0
         self.max_angle = 90
@@ -2171,8 +2432,46 @@ class square_mirror:
         obj.Shape = part
 
 
+_propagating = False
+
+# apply a changed placement property to an object and everything placed relative to it
+def _update_placement(obj, prop):
+    global _propagating
+    # placements are applied in one pass when a baseplate batch closes
+    if layout._batch_depth > 0:
+        return
+    if str(prop) == "BasePlacement":
+        if obj.Baseplate != None:
+            placement = obj.Baseplate.Placement.multiply(obj.BasePlacement)
+        else:
+            placement = obj.BasePlacement
+        if obj.Placement != placement:
+            obj.Placement = placement
+
+        # the whole subtree is written by the object that started the update
+        if _propagating:
+            return
+        placements = _compose_children(obj, obj.BasePlacement, [])
+        _propagating = True
+        try:
+            for child, placement in placements:
+                if child.BasePlacement != placement:
+                    child.BasePlacement = placement
+        finally:
+            _propagating = False
+    if str(prop) == "Placement" and getattr(obj, "InstanceLink", None) != None:
+        obj.InstanceLink.Placement = obj.Placement
+    if str(prop) == "RelativePlacement":
+        _invalidate_relative(obj)
+    if str(prop) == "Angle":
+        obj.BasePlacement.Rotation = App.Rotation(App.Vector(0, 0, 1), obj.Angle)
+    return
+
 class ViewProvider:
     def __init__(self, obj):
+        # there are no view objects when running without a GUI
+        if obj == None:
+            return
         obj.Proxy = self
         self.Object = obj.Object
 
@@ -2189,36 +2488,21 @@ class ViewProvider:
         if hasattr(feature.Object, "ChildObjects"):
             for obj in feature.Object.ChildObjects:
                 App.ActiveDocument.removeObject(obj.Name)
+        if getattr(feature.Object, "InstanceLink", None) != None:
+            App.ActiveDocument.removeObject(feature.Object.InstanceLink.Name)
         return True
     
     def updateData(self, obj, prop):
-        if str(prop) == "BasePlacement":
-            if obj.Baseplate != None:
-                obj.Placement.Base = obj.BasePlacement.Base + obj.Baseplate.Placement.Base
-                obj.Placement = App.Placement(obj.Placement.Base, obj.Baseplate.Placement.Rotation, -obj.BasePlacement.Base)
-                obj.Placement.Rotation = obj.Placement.Rotation.multiply(obj.BasePlacement.Rotation)
-            else:
-                obj.Placement = obj.BasePlacement
-            if hasattr(obj, "ChildObjects"):
-                for child in obj.ChildObjects:
-                    child.BasePlacement.Base = obj.BasePlacement.Base + child.RelativePlacement.Base
-                    if hasattr(child, "Angle"):
-                        obj.BasePlacement.Rotation = App.Rotation(App.Vector(0, 0, 1), obj.Angle)
-                    else:
-                        child.BasePlacement = App.Placement(child.BasePlacement.Base, obj.BasePlacement.Rotation, -child.RelativePlacement.Base)
-                        child.BasePlacement.Rotation = child.BasePlacement.Rotation.multiply(child.RelativePlacement.Rotation)
-            if hasattr(obj, "RelativeObjects"):
-                for child in obj.RelativeObjects:
-                    child.BasePlacement.Base = obj.BasePlacement.Base + child.RelativePlacement.Base
-        if str(prop) == "Angle":
-            obj.BasePlacement.Rotation = App.Rotation(App.Vector(0, 0, 1), obj.Angle)
+        _update_placement(obj, prop)
         return
     
     def claimChildren(self):
+        children = []
+        if getattr(self.Object, "InstanceLink", None) != None:
+            children.append(self.Object.InstanceLink)
         if hasattr(self.Object, "ChildObjects"):
-            return self.Object.ChildObjects
-        else:
-            return []
+            children.extend(self.Object.ChildObjects)
+        return children
 
     def getIcon(self):
         return """
@@ -0,0 +1,173 @@
+import ast
+import hashlib
+import json
+import os
+import re
+import sys
+import numpy as np
+from pathlib import Path
+
+stl_path = Path(__file__).parent.resolve() / "stl"
+index_file = stl_path / "index.json"
+format_version = 1
+
+_index = None # the loaded index, shared by every lookup in a session
+_stamps = {} # (mtime, size) of each file when it was last hashed this session
+_binary_facet = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attr", "<u2")])
+
+def read_stl(filename):
+    '''
+    Read the triangles of a binary or ASCII STL file as an (n, 3, 3) array
+
+    Args:
+        filename (string): Path to the STL file
+    '''
+    with open(filename, "rb") as f:
+        data = f.read()
+    if len(data) >= 84:
+        count = int(np.frombuffer(data, "<u4", 1, 80)[0])
+        if len(data) == 84+count*_binary_facet.itemsize:
+            return np.frombuffer(data, _binary_facet, count, 84)["vertices"].astype(float)
+    values = re.findall(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)", data)
+    return np.array(values, dtype=float).reshape(-1, 3, 3)
+
+# the transform optomech._import_stl applies, scale then rotations about x, y and z then translation
+def _transform(points, rotate, translate, scale):
+    x, y, z = np.deg2rad(rotate)
+    rx = np.array([[1, 0, 0], [0, np.cos(x), -np.sin(x)], [0, np.sin(x), np.cos(x)]])
+    ry = np.array([[np.cos(y), 0, np.sin(y)], [0, 1, 0], [-np.sin(y), 0, np.cos(y)]])
+    rz = np.array([[np.cos(z), -np.sin(z), 0], [np.sin(z), np.cos(z), 0], [0, 0, 1]])
+    return (points*scale) @ (rz @ ry @ rx).T + np.array(translate, dtype=float)
+
+# convex hull of a set of 2D points, counterclockwise
+def _hull(points):
+    points = sorted(set(map(tuple, np.round(points, 4).tolist())))
+    if len(points) < 3:
+        return points
+    def half(points):
+        hull = []
+        for p in points:
+            while len(hull) >= 2 and (hull[-1][0]-hull[-2][0])*(p[1]-hull[-2][1])-(hull[-1][1]-hull[-2][1])*(p[0]-hull[-2][0]) <= 0:
+                hull.pop()
+            hull.append(p)
+        return hull
+    return half(points)[:-1]+half(points[::-1])[:-1]
+
+def _entry_key(stl_name, rotate, translate, scale):
+    return "%s|%s|%s|%s"%(stl_name, ",".join(repr(float(i)) for i in rotate), ",".join(repr(float(i)) for i in translate), repr(float(scale)))
+
+def _compute(triangles, rotate, translate, scale):
+    points = _transform(triangles.reshape(-1, 3), rotate, translate, scale)
+    tris = points.reshape(-1, 3, 3)
+    areas = np.linalg.norm(np.cross(tris[:, 1]-tris[:, 0], tris[:, 2]-tris[:, 0]), axis=1)/2
+    centers = tris.mean(axis=1)
+    centroid = (centers*areas[:, None]).sum(axis=0)/areas.sum() if areas.sum() > 0 else centers.mean(axis=0)
+    return dict(bound=points.min(axis=0).tolist()+points.max(axis=0).tolist(),
+                footprint=[list(i) for i in _hull(points[:, :2])],
+                centroid=centroid.tolist(), triangles=len(tris))
+
+def load():
+    '''
+    Load the index, creating an empty one if it doesn't exist or is from an older version
+    '''
+    global _index
+    if _index == None:
+        _index = dict(version=format_version, files={}, entries={})
+        if index_file.is_file():
+            try:
+                with open(index_file) as f:
+                    data = json.load(f)
+                if data.get("version") == format_version:
+                    _index = data
+            except ValueError:
+                pass
+    return _index
+
+def save():
+    '''
+    Write the index next to the STL files, lookups never write it so only refresh does
+    '''
+    temp = index_file.with_suffix(".tmp")
+    with open(temp, "w") as f:
+        json.dump(load(), f, indent=1, sort_keys=True)
+    os.replace(temp, index_file)
+
+# check an STL against the index, dropping its entries if the file's contents changed
+# the file is only hashed once per session unless it's modified
+def _check_file(stl_name):
+    index = load()
+    stat = (stl_path / stl_name).stat()
+    record = index["files"].get(stl_name)
+    if record != None and _stamps.get(stl_name) == (stat.st_mtime, stat.st_size):
+        return
+    with open(stl_path / stl_name, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    _stamps[stl_name] = (stat.st_mtime, stat.st_size)
+    if record != None and record["hash"] == digest:
+        return
+    for key in [i for i in index["entries"] if i.split("|")[0] == stl_name]:
+        del index["entries"][key]
+    index["files"][stl_name] = dict(size=stat.st_size, hash=digest)
+
+def info(stl_name, rotate=(0, 0, 0), translate=(0, 0, 0), scale=1):
+    '''
+    Get the metadata of an STL model under an import transform, without loading the mesh when it's indexed
+
+    Transforms which aren't in the index yet, such as ones depending on component parameters,
+    are computed and kept in memory for the session, the index file is only written by refresh
+
+    The result holds the local bounds [xmin, ymin, zmin, xmax, ymax, zmax], the 2D convex footprint,
+    the area weighted centroid, the triangle count and the content hash of the file
+
+    Args:
+        stl_name (string): The file name of the model in the stl folder
+        rotate (float[3]): Rotations about x, y and z in degrees, as given to optomech._import_stl
+        translate (float[3]): The translation applied after rotating
+        scale (float): The scale applied before rotating
+    '''
+    _check_file(stl_name)
+    index = load()
+    key = _entry_key(stl_name, rotate, translate, scale)
+    if key not in index["entries"]:
+        index["entries"][key] = _compute(read_stl(stl_path / stl_name), rotate, translate, scale)
+    return dict(index["entries"][key], hash=index["files"][stl_name]["hash"])
+
+# import transforms written as literals in optomech, so the index can be built ahead of time
+def _known_transforms():
+    source = (Path(__file__).parent / "optomech.py").read_text()
+    transforms = []
+    for match in re.finditer(r"_import_stl\((\"[^\"]+\"), (\([^()]*\)), (\(\[?[^()]*\]?\))\)", source):
+        try:
+            name, rotate, translate = [ast.literal_eval(i) for i in match.groups()]
+        except (ValueError, SyntaxError):
+            continue # transforms depending on parameters are indexed when first used
+        transforms.append((name, rotate, translate))
+    return transforms
+
+def refresh():
+    '''
+    Bring the index up to date with the STL folder, indexing every import transform used in optomech
+    '''
+    index = load()
+    for name in list(index["files"]):
+        if not (stl_path / name).is_file():
+            del index["files"][name]
+            for key in [i for i in index["entries"] if i.split("|")[0] == name]:
+                del index["entries"][key]
+    for name, rotate, translate in _known_transforms():
+        if (stl_path / name).is_file():
+            info(name, rotate, translate)
+        else:
+            print("%s isn't in the stl folder, its components fall back to vertex bounds"%name)
+    for path in stl_path.glob("*.stl"):
+        _check_file(path.name)
+    # transforms found at runtime depend on component parameters, so they aren't written out
+    known = set(_entry_key(name, rotate, translate, 1) for name, rotate, translate in _known_transforms())
+    for key in [i for i in index["entries"] if i not in known]:
+        del index["entries"][key]
+    save()
+
+if __name__ == "__main__":
+    refresh()
+    print("Indexed %d transforms of %d models"%(len(load()["entries"]), len(load()["files"])))
+    sys.exit(0)
@@ -0,0 +1,62 @@
+import FreeCAD as App
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+
+# find a python interpreter that can import the FreeCAD modules
+def _find_python():
+    if Path(sys.executable).stem.lower().startswith("python"):
+        return sys.executable
+    home = Path(App.getHomePath())
+    for folder in [home / "bin", home]:
+        for name in ["python", "python3", "python.exe"]:
+            if (folder / name).is_file():
+                return str(folder / name)
+    return None
+
+# paths a spawned worker needs to import FreeCAD and PyOptic
+def _worker_paths():
+    home = Path(App.getHomePath())
+    return [str(home / "lib"), str(home / "bin"), str(Path(__file__).parent.parent)]
+
+def _init_worker(paths):
+    sys.path[:0] = [i for i in paths if i not in sys.path]
+    import FreeCAD
+
+def imap(func, items, processes=None, progress=None):
+    '''
+    Run a function over a list of items in a pool of worker processes, yielding results in order
+
+    Falls back to running in this process if only one process is requested or
+    no interpreter able to import FreeCAD can be found
+
+    Args:
+        func (function): A module level function which takes a single item
+        items (list): The items to process, these must be picklable
+        processes (int): The number of worker processes, defaults to the number of cores
+        progress (function): Called with the number of finished items and the total after each item
+    '''
+    items = list(items)
+    if processes == None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(items))
+    python = _find_python()
+
+    if processes <= 1 or python == None:
+        results = map(func, items)
+        pool = None
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        ctx.set_executable(python)
+        pool = ctx.Pool(processes, initializer=_init_worker, initargs=(_worker_paths(),))
+        results = pool.imap(func, items)
+
+    try:
+        for i, result in enumerate(results):
+            if progress != None:
+                progress(i+1, len(items))
+            yield result
+    finally:
+        if pool != None:
+            pool.terminate()
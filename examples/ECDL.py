@@ -21,6 +21,7 @@ input_y = 32
 
 mount_holes=[[2,0],[2,4],[5,0],[4,4]]
 
+@layout.subassembly
 def ECDL(x=0, y=0, angle=0, mirror=optomech.mirror_mount_km05):
 
     baseplate = layout.baseplate(base_dx, base_dy, base_dz, x=x, y=y, angle=angle,
@@ -13,6 +13,7 @@ mount_holes = [(0, 0), (0, 3), (3, 0), (3, 3)]
 input_y = 1.5*layout.inch
 
 # function so baseplate can be added to other layouts
+@layout.subassembly
 def example_baseplate(x=0, y=0, angle=0):
 
     # define and place baseplate object
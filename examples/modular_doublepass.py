@@ -16,6 +16,7 @@ mount_holes = [(0, 0), (1, 4), (9, 0), (9, 3)]
 
 extra_mount_holes = [(3, 0), (3, 2), (4, 0), (6, 2)]
 
+@layout.subassembly
 def doublepass(x=0, y=0, angle=0, mirror=optomech.mirror_mount_km05, x_split=False, thumbscrews=True):
 
     baseplate = layout.baseplate(base_dx, base_dy, base_dz, x=x, y=y, angle=angle,
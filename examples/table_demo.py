@@ -5,9 +5,8 @@ from modular_doublepass import doublepass
 
 layout.table_grid(dx=17, dy=21)
 
-ECDL(x=8, y=7, angle=-90)
-#Rb_SAS(x=0, y=7)
-doublepass(x=6, y=11)
-doublepass(x=7, y=16)
-
-layout.redraw()
\ No newline at end of file
+# each module is built in its own worker process and merged into the table
+layout.build_parallel([(ECDL, dict(x=8, y=7, angle=-90)),
+                       #(Rb_SAS, dict(x=0, y=7)),
+                       (doublepass, dict(x=6, y=11)),
+                       (doublepass, dict(x=7, y=16))])
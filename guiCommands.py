@@ -3,12 +3,9 @@ import FreeCADGui as Gui
 from PySide import QtGui
 import Mesh
 
-import csv
-import re
-import math
 import numpy as np
 from pathlib import Path
-from PyOptic import laser, layout, optomech
+from PyOptic import laser, layout, optomech, journal, workers, export, bom, machining, cache, stl_index
 
 class Rerun_Macro():
     def GetResources(self):
@@ -19,6 +16,9 @@ class Rerun_Macro():
     def Activated(self):
         for i in App.ActiveDocument.Objects:
             App.ActiveDocument.removeObject(i.Name)
+        journal.clear()
+        optomech._forget_document(App.ActiveDocument)
+        optomech.clear_primitive_cache()
         Gui.runCommand('Std_RecentMacros',0)
         return
 
@@ -33,6 +33,18 @@ class Redraw_Baseplate():
         layout.redraw()
         return
     
+class Check_Collisions():
+
+    def GetResources(self):
+        return {"Pixmap"  : ":/icons/Std_ViewBoxZoom.svg",
+                "Accel"   : "Shift+C",
+                "MenuText": "Check Baseplates for Colliding Components"}
+
+    def Activated(self):
+        collisions = layout.check_collisions()
+        App.Console.PrintMessage("%d collisions found\n"%(len(collisions)))
+        return
+
 class Show_Components():
 
     def __init__(self):
@@ -70,30 +82,20 @@ class Export_STLs():
     def GetResources(self):
         return {"Pixmap"  : ":/icons/LinkSelect.svg",
                 "Accel"   : "Shift+E",
-                "MenuText": "Export Baselplate and Adapter STLs to Downloads Folder"}
+                "MenuText": "Export Baseplate, Cover and Adapter STLs to Downloads Folder"}
 
     def Activated(self):
-        export_path = str(Path.home() / "Downloads" / "FreeCAD_Optics_Export_")
-        n = 0
-        while Path(export_path+str(n)).is_dir():
-            n += 1
-
-        path = Path(export_path+str(n))
-        path.mkdir()
-        doc = App.activeDocument()
-        for obj in doc.Objects:
-            if isinstance(obj.Proxy, layout.baseplate) or all(np.isclose(obj.ViewObject.ShapeColor[:3], optomech.adapter_color)):
-                if hasattr(obj, "Shape"):
-                    exploded = obj.Shape.Solids
-                    for i, shape in enumerate(exploded):
-                        name = str(path / obj.Name)
-                        if len(exploded) > 1:
-                            name += "_" + str(i)
-                        shape.exportStl(name + ".stl")
-                else:
-                    Mesh.export([obj], str(path / obj.Name) + ".stl")
+        params = App.ParamGet("User parameter:BaseApp/Preferences/Mod/PyOptic")
+        path = export.export_stls(progress=self.progress, incremental=True,
+                                  linear_deflection=params.GetFloat("ExportLinearDeflection", 0.05),
+                                  angular_deflection=params.GetFloat("ExportAngularDeflection", 0.3),
+                                  archive=params.GetBool("Export3MF", False))
         App.Console.PrintMessage("STLs Exported to '%s'\n"%(str(path)))
         return
+
+    def progress(self, done, total):
+        App.Console.PrintMessage("Exported %d/%d\n"%(done, total))
+        Gui.updateGui()
     
     
 class Export_Cart():
@@ -112,69 +114,10 @@ class Export_Cart():
         path = Path(export_path+str(n))
         path.mkdir()
 
-        doc = App.activeDocument()
-        parts = []
-        types = []
-        objs = []
-        for obj in doc.Objects:
-            if hasattr(obj.Proxy, 'part_numbers'):
-                if '' in obj.Proxy.part_numbers:
-                    name = obj.Label
-                    temp = obj
-                    while True:
-                        if hasattr(temp, "ParentObject"):
-                            name = temp.ParentObject.Label + " - " + name
-                            temp = temp.ParentObject
-                        else:
-                            break
-                    App.Console.PrintMessage(name + " is missing a part number\n")
-                parts.extend(obj.Proxy.part_numbers)
-                for num in obj.Proxy.part_numbers:
-                    types.append((type(obj.Proxy).__name__, num))
-                objs.extend([obj]*len(obj.Proxy.part_numbers))
-
-        cart = open(str(path / "Thorlabs_Cart.csv"), 'w', newline='')
-        list = open(str(path / "Parts_List.csv"), 'w', newline='')
-        cart_w= csv.writer(cart)
-        list_w= csv.writer(list)
-        cart_w.writerow(["Part Number", "Qty"])
-        list_w.writerow(["Part Class / Name", "Part Number", "Qty"])
-
-        for i in set(parts):
-            if i != '':
-                number = i
-                test1 = re.match(".*-P([0-9]+)$", i)
-                test2 = re.match(".*\(P([0-9]+)\)$", i)
-                pack = 1
-                if test1 != None:
-                    pack = int(test1.group(1))
-                if test2 != None:
-                    pack = int(test2.group(1))
-                    number = number[:-(4+len(test2.group(1)))]
-                cart_w.writerow([number, math.ceil(parts.count(i)/pack)])
-        for i in set(types):
-            if i[1] != '':
-                number = i[1]
-                test1 = re.match(".*-P([0-9]+)$", i[1])
-                test2 = re.match(".*\(P([0-9]+)\)$", i[1])
-                pack = 1
-                if test1 != None:
-                    pack = int(test1.group(1))
-                if test2 != None:
-                    pack = int(test2.group(1))
-                    number = number[:-(4+len(test2.group(1)))]
-                list_w.writerow([i[0], number, math.ceil(parts.count(i[1])/pack)])
-        for i in enumerate(parts):    
-            if i[1] == '':
-                name = objs[i[0]].Label
-                temp = objs[i[0]]
-                while True:
-                    if hasattr(temp, "ParentObject"):
-                        name = temp.ParentObject.Label + " - " + name
-                        temp = temp.ParentObject
-                    else:
-                        break
-                list_w.writerow([name, "Unknown", 1])
+        cart = bom.collect()
+        for name in cart.missing:
+            App.Console.PrintMessage(name + " is missing a part number\n")
+        cart.write_csv(path)
         return
     
 class Reload_Modules():
@@ -186,9 +129,16 @@ class Reload_Modules():
 
     def Activated(self):
         from importlib import reload
+        reload(journal)
+        reload(machining)
+        reload(cache)
+        reload(stl_index)
         reload(optomech)
         reload(layout)
         reload(laser)
+        reload(workers)
+        reload(export)
+        reload(bom)
         App.Console.PrintMessage("Freecad Optics Modules Reloaded\n")
         return
     
@@ -282,6 +232,7 @@ class Get_Position():
 
 Gui.addCommand("RerunMacro", Rerun_Macro())
 Gui.addCommand("RedrawBaseplate", Redraw_Baseplate())
+Gui.addCommand("CheckCollisions", Check_Collisions())
 Gui.addCommand("ShowComponents", Show_Components())
 Gui.addCommand("ToggleDrawStyle", Toggle_Draw_Style())
 Gui.addCommand("ExportSTLs", Export_STLs())
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# the tests import the PyOptic package from this checkout, tests needing FreeCAD are skipped unless
+# its modules can be imported, either from FreeCAD's python or with its lib folder on PYTHONPATH
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
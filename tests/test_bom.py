@@ -0,0 +1,46 @@
+import csv
+import pytest
+
+pytest.importorskip("FreeCAD")
+from PyOptic import bom
+
+class mount:
+    def __init__(self, *part_numbers):
+        self.part_numbers = list(part_numbers)
+
+def test_parse_part_number():
+    assert bom.parse_part_number("KM05") == ("KM05", 1)
+    assert bom.parse_part_number("SH8S038-P10") == ("SH8S038-P10", 10)
+    assert bom.parse_part_number("HKTS 5-64 (P5)") == ("HKTS 5-64", 5)
+    assert bom.parse_part_number("HKTS(P25)") == ("HKTS", 25)
+    assert bom.parse_part_number("P10") == ("P10", 1)
+
+def test_order_rounds_up_to_whole_packs():
+    parts = bom.BOM()
+    for _ in range(7):
+        parts.add("Mount", mount("KM05", "HKTS 5-64 (P5)"))
+    assert parts.order() == [("HKTS 5-64", 2), ("KM05", 7)]
+
+def test_parts_list_and_missing_numbers():
+    parts = bom.BOM()
+    parts.add("Mirror", mount("KM05"))
+    parts.add("Baseplate/Unknown Mount", mount(""))
+    assert parts.parts_list() == [("mount", "KM05", 1), ("Baseplate/Unknown Mount", "Unknown", 1)]
+
+def test_update_merges_counts():
+    first, second = bom.BOM(), bom.BOM()
+    first.add("A", mount("KM05"))
+    second.add("B", mount("KM05"))
+    second.add("C", mount(""))
+    first.update(second)
+    assert first.parts["KM05"] == 2
+    assert first.missing == ["C"]
+
+def test_write_csv(tmp_path):
+    parts = bom.BOM()
+    parts.add("Mirror", mount("KM05", "HKTS (P5)"))
+    parts.write_csv(tmp_path)
+    with open(tmp_path / "Thorlabs_Cart.csv", newline='') as f:
+        assert list(csv.reader(f)) == [["Part Number", "Qty"], ["HKTS", "1"], ["KM05", "1"]]
+    with open(tmp_path / "Parts_List.csv", newline='') as f:
+        assert list(csv.reader(f))[0] == ["Part Class / Name", "Part Number", "Qty"]
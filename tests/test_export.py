@@ -0,0 +1,60 @@
+import json
+import pytest
+
+pytest.importorskip("FreeCAD")
+from PyOptic import export
+
+def write_manifest(path, parts):
+    path.mkdir(parents=True, exist_ok=True)
+    with open(path / "manifest.json", "w") as f:
+        json.dump(dict(version=1, parts=parts), f)
+
+def test_read_manifest_missing(tmp_path):
+    assert export._read_manifest(None) == {}
+    assert export._read_manifest(tmp_path) == {}
+
+def test_read_manifest(tmp_path):
+    parts = {"plate.stl": dict(hash="abc", settings={})}
+    write_manifest(tmp_path, parts)
+    assert export._read_manifest(tmp_path) == parts
+
+def test_reuse_links_unchanged_file(tmp_path):
+    old, new = tmp_path / "old", tmp_path / "new"
+    entry = dict(hash="abc", settings=dict(linear=0.05))
+    write_manifest(old, {"plate.stl": entry})
+    (old / "plate.stl").write_bytes(b"solid")
+    new.mkdir()
+    assert export._reuse(old, new, "plate.stl", export._read_manifest(old), dict(entry))
+    assert (new / "plate.stl").read_bytes() == b"solid"
+
+def test_reuse_rejects_changed_entries(tmp_path):
+    old, new = tmp_path / "old", tmp_path / "new"
+    write_manifest(old, {"plate.stl": dict(hash="abc", settings={})})
+    (old / "plate.stl").write_bytes(b"solid")
+    new.mkdir()
+    manifest = export._read_manifest(old)
+    assert not export._reuse(old, new, "plate.stl", manifest, dict(hash="def", settings={}))
+    assert not export._reuse(old, new, "plate.stl", manifest, dict(hash="abc", settings=dict(linear=0.1)))
+    assert not export._reuse(None, new, "plate.stl", manifest, dict(hash="abc", settings={}))
+    assert not (new / "plate.stl").exists()
+
+def test_reuse_needs_previous_file(tmp_path):
+    old, new = tmp_path / "old", tmp_path / "new"
+    entry = dict(hash="abc", settings={})
+    write_manifest(old, {"plate.stl": entry})
+    new.mkdir()
+    assert not export._reuse(old, new, "plate.stl", export._read_manifest(old), entry)
+
+def test_reuse_in_place(tmp_path):
+    entry = dict(hash="abc", settings={})
+    write_manifest(tmp_path, {"plate.stl": entry})
+    (tmp_path / "plate.stl").write_bytes(b"solid")
+    assert export._reuse(tmp_path, tmp_path, "plate.stl", export._read_manifest(tmp_path), entry)
+    assert (tmp_path / "plate.stl").read_bytes() == b"solid"
+
+def test_next_index(tmp_path):
+    prefix = str(tmp_path / "Export_")
+    assert export._next_index(prefix) == 0
+    (tmp_path / "Export_0").mkdir()
+    (tmp_path / "Export_1").mkdir()
+    assert export._next_index(prefix) == 2
@@ -0,0 +1,49 @@
+import json
+import numpy as np
+import pytest
+
+App = pytest.importorskip("FreeCAD")
+from PyOptic import journal, bom
+
+# encode a value, pass it through json as a saved journal would be and decode it again
+def round_trip(value, doc=None, names={}):
+    return journal._decode(json.loads(json.dumps(journal._encode(value))), doc, names)
+
+def test_plain_values():
+    value = [1, 2.5, "a", None, True, [3, [4]]]
+    assert round_trip(value) == value
+
+def test_tuples_and_dicts_keep_their_type():
+    value = {"offset": (1, 2, 3), "nested": {"list": [(4, 5)]}}
+    assert round_trip(value) == value
+    assert isinstance(round_trip((1, 2)), tuple)
+
+def test_numpy_values_become_plain():
+    assert round_trip(np.array([[1, 2], [3, 4]])) == [[1, 2], [3, 4]]
+    assert round_trip(np.float64(1.5)) == 1.5
+    assert type(journal._encode(np.int32(3))) == int
+
+def test_vectors_and_placements():
+    assert round_trip(App.Vector(1, 2, 3)) == App.Vector(1, 2, 3)
+    placement = App.Placement(App.Vector(1, 2, 3), App.Rotation(30, 10, 5))
+    assert round_trip(placement).isSame(placement, 1e-9)
+
+def test_classes_and_functions():
+    assert round_trip(bom.BOM) is bom.BOM
+    assert round_trip(bom.parse_part_number) is bom.parse_part_number
+
+def test_objects_are_remapped_by_name():
+    doc = App.newDocument("JournalTest")
+    try:
+        old = doc.addObject("App::FeaturePython", "Old")
+        new = doc.addObject("App::FeaturePython", "New")
+        assert round_trip(old, doc) == old
+        assert round_trip(old, doc, {"Old": "New"}) == new
+    finally:
+        App.closeDocument(doc.Name)
+
+def test_unsupported_values():
+    with pytest.raises(TypeError):
+        journal._encode(object())
+    with pytest.raises(ValueError):
+        journal._decode({"unknown": 1}, None, {})
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("FreeCAD")
+from PyOptic import laser
+
+facet = np.array([[[-100, -100, 0], [100, -100, 0], [0, 100, 0]]], dtype=float)
+
+def test_beam_over_the_middle_of_a_facet():
+    assert laser._segment_distance(np.array([-5, 0, 1.0]), np.array([5, 0, 1.0]), facet) == pytest.approx(1)
+
+def test_beam_through_a_facet():
+    assert laser._segment_distance(np.array([0, 0, -1.0]), np.array([0, 0, 1.0]), facet) == 0
+
+def test_beam_past_an_edge():
+    dist = laser._segment_distance(np.array([-200, -103, 0.0]), np.array([200, -103, 0.0]), facet)
+    assert dist == pytest.approx(3)
+
+def test_beam_end_over_a_face():
+    dist = laser._segment_distance(np.array([0, 0, 2.0]), np.array([0, 0, 50.0]), facet)
+    assert dist == pytest.approx(2)
+
+def test_no_facets():
+    assert laser._segment_distance(np.zeros(3), np.ones(3), np.zeros((0, 3, 3))) == np.inf
+
+def test_matches_sampled_distance():
+    rng = np.random.default_rng(0)
+    u, v = np.meshgrid(np.linspace(0, 1, 150), np.linspace(0, 1, 150))
+    u, v = u[u+v <= 1], v[u+v <= 1]
+    s = np.linspace(0, 1, 150)
+    for _ in range(20):
+        tri = rng.normal(size=(1, 3, 3))*3
+        p1, p2 = rng.normal(size=3)*3, rng.normal(size=3)*3
+        points = tri[0, 0]+u[:, None]*(tri[0, 1]-tri[0, 0])+v[:, None]*(tri[0, 2]-tri[0, 0])
+        beam = p1+s[:, None]*(p2-p1)
+        sampled = np.min(np.linalg.norm(points[None]-beam[:, None], axis=2))
+        dist = laser._segment_distance(p1, p2, tri)
+        assert dist <= sampled+1e-9
+        assert sampled-dist < 0.2
@@ -0,0 +1,33 @@
+import pytest
+
+App = pytest.importorskip("FreeCAD")
+from PyOptic import layout
+
+def box(x0, y0, x1, y1, z0=0, z1=1):
+    return App.BoundBox(x0, y0, z0, x1, y1, z1)
+
+def test_sweep_pairs_finds_overlapping_boxes():
+    boxes = [(box(0, 0, 2, 2), "a"), (box(1, 1, 3, 3), "b"), (box(5, 0, 6, 1), "c")]
+    assert layout._sweep_pairs(boxes) == [("a", "b")]
+
+def test_sweep_pairs_ignores_boxes_only_overlapping_in_x():
+    boxes = [(box(0, 0, 2, 1), "a"), (box(1, 5, 3, 6), "b"), (box(1, 0, 3, 1, 2, 3), "c")]
+    assert layout._sweep_pairs(boxes) == []
+
+def test_sweep_pairs_touching_boxes_dont_overlap():
+    boxes = [(box(0, 0, 1, 1), "a"), (box(1, 0, 2, 1), "b")]
+    assert layout._sweep_pairs(boxes) == []
+
+def test_sweep_pairs_matches_brute_force():
+    import random
+    rng = random.Random(0)
+    boxes = []
+    for n in range(60):
+        x, y, z = rng.uniform(0, 20), rng.uniform(0, 20), rng.uniform(0, 2)
+        boxes.append((box(x, y, x+rng.uniform(0.5, 3), y+rng.uniform(0.5, 3), z, z+1), n))
+    expected = set()
+    for i, (b1, n1) in enumerate(boxes):
+        for b2, n2 in boxes[i+1:]:
+            if layout.check_bound(b1, b2):
+                expected.add(frozenset((n1, n2)))
+    assert set(frozenset(i) for i in layout._sweep_pairs(boxes)) == expected
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+App = pytest.importorskip("FreeCAD")
+import Part
+from PyOptic import machining
+
+def test_is_prismatic():
+    assert machining._is_prismatic(Part.makeBox(10, 10, 5))
+    assert machining._is_prismatic(Part.makeCylinder(2, 5))
+    assert not machining._is_prismatic(Part.makeSphere(2))
+    assert not machining._is_prismatic(Part.makeCylinder(2, 5, App.Vector(0, 0, 0), App.Vector(1, 0, 0)))
+
+def test_machine_matches_boolean_cut():
+    stock = Part.makeBox(40, 30, 10)
+    tools = [Part.makeCylinder(2, 20, App.Vector(10, 10, -5)),
+             Part.makeCylinder(4, 4, App.Vector(10, 10, 7)),
+             Part.makeBox(6, 6, 3, App.Vector(25, 15, 8)),
+             Part.makeSphere(3, App.Vector(30, 5, 10))]
+    part = machining.machine(stock, tools)
+    assert part.isValid()
+    assert part.Volume == pytest.approx(stock.cut(tools).Volume, rel=1e-6)
+
+def test_rasterize_chunks_agree():
+    rng = np.random.default_rng(1)
+    tris = rng.uniform(0, 10, (200, 3, 3))
+    xs, ys = np.linspace(0, 10, 41), np.linspace(0, 10, 33)
+    whole = machining._rasterize(xs, ys, tris)
+    chunked = machining._rasterize(xs, ys, tris, chunk=7)
+    assert whole[:2] == chunked[:2]
+    assert np.array_equal(whole[2], chunked[2]) and np.array_equal(whole[3], chunked[3])
+
+def test_rasterize_skips_vertical_triangles():
+    tris = np.array([[[0, 0, 0], [1, 0, 0], [1, 0, 1]]], dtype=float)
+    assert machining._rasterize(np.linspace(0, 2, 5), np.linspace(0, 2, 5), tris) == None
+
+def test_heightmap_carves_tools_open_to_the_top():
+    stock = App.BoundBox(0, 0, 0, 10, 10, 5)
+    through = Part.makeBox(2, 2, 10, App.Vector(7, 1, -2))
+    pocket = Part.makeBox(2, 2, 3, App.Vector(2, 2, 3))
+    inside = Part.makeBox(2, 2, 2, App.Vector(6, 6, 1))
+    xs, ys, heights = machining.heightmap(stock, [through, pocket, inside], 1)
+    assert heights.shape == (len(xs), len(ys)) == (11, 11)
+    assert heights[8, 2] == pytest.approx(0)
+    assert heights[3, 3] == pytest.approx(3)
+    assert heights[7, 7] == pytest.approx(5)
+    assert heights[0, 0] == pytest.approx(5)
+
+def test_heightmap_mesh_leaves_holes():
+    xs, ys = np.linspace(0, 4, 5), np.linspace(0, 4, 5)
+    heights = np.full((5, 5), 5.0)
+    solid = machining.heightmap_mesh(xs, ys, heights, 0)
+    heights[2, 2] = 0
+    holed = machining.heightmap_mesh(xs, ys, heights, 0)
+    # every grid square is two triangles plus two for the bottom, the through point removes its six
+    assert solid.CountFacets == 4*4*2+2
+    assert holed.CountFacets == solid.CountFacets-6
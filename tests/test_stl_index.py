@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from PyOptic import stl_index
+
+# a unit cube as 12 triangles
+def cube():
+    corners = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=float)
+    faces = [(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+             (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)]
+    return corners[np.array(faces)]
+
+def write_binary(path, tris):
+    data = np.zeros(len(tris), stl_index._binary_facet)
+    data["vertices"] = tris
+    with open(path, "wb") as f:
+        f.write(b"\0"*80+np.uint32(len(tris)).tobytes()+data.tobytes())
+
+def write_ascii(path, tris):
+    lines = ["solid test"]
+    for tri in tris:
+        lines += ["facet normal 0 0 0", "outer loop"]
+        lines += ["vertex %g %g %g"%tuple(v) for v in tri]
+        lines += ["endloop", "endfacet"]
+    path.write_text("\n".join(lines+["endsolid test"]))
+
+def test_read_stl_binary_and_ascii(tmp_path):
+    tris = cube()
+    write_binary(tmp_path / "binary.stl", tris)
+    write_ascii(tmp_path / "ascii.stl", tris)
+    assert np.allclose(stl_index.read_stl(tmp_path / "binary.stl"), tris)
+    assert np.allclose(stl_index.read_stl(tmp_path / "ascii.stl"), tris)
+
+def test_compute_cube():
+    info = stl_index._compute(cube(), (0, 0, 0), (0, 0, 0), 1)
+    assert info["bound"] == pytest.approx([0, 0, 0, 1, 1, 1])
+    assert info["centroid"] == pytest.approx([0.5, 0.5, 0.5])
+    assert info["triangles"] == 12
+    assert sorted(map(tuple, info["footprint"])) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+
+def test_compute_applies_scale_rotation_then_translation():
+    info = stl_index._compute(cube(), (0, 0, 90), (10, 0, 0), 2)
+    # scaled to 2, turned a quarter about z so x spans -2 to 0, then moved 10 along x
+    assert info["bound"] == pytest.approx([8, 0, 0, 10, 2, 2])
+    assert info["centroid"] == pytest.approx([9, 1, 1])
+
+def test_transform_rotation_order():
+    point = np.array([[1.0, 0, 0]])
+    # the x rotation is applied first and leaves a point on the x axis alone, then y turns it down
+    assert np.allclose(stl_index._transform(point, (90, 90, 0), (0, 0, 0), 1), [[0, 0, -1]])
+    assert np.allclose(stl_index._transform(point, (0, 0, 90), (0, 0, 0), 1), [[0, 1, 0]])
+
+def test_hull_is_counterclockwise_without_interior_points():
+    points = np.array([[0, 0], [2, 0], [2, 2], [0, 2], [1, 1], [1, 0]])
+    hull = stl_index._hull(points)
+    assert sorted(hull) == [(0, 0), (0, 2), (2, 0), (2, 2)]
+    area = sum(x1*y2-x2*y1 for (x1, y1), (x2, y2) in zip(hull, hull[1:]+hull[:1]))/2
+    assert area == pytest.approx(4)
+
+def test_entry_key_normalizes_numbers():
+    assert stl_index._entry_key("a.stl", (90, 0, 0), [1, 2, 3], 1) == stl_index._entry_key("a.stl", (90.0, 0.0, 0.0), (1.0, 2.0, 3.0), 1.0)
+
+def test_info_keeps_new_transforms_in_memory(tmp_path, monkeypatch):
+    write_binary(tmp_path / "cube.stl", cube())
+    monkeypatch.setattr(stl_index, "stl_path", tmp_path)
+    monkeypatch.setattr(stl_index, "index_file", tmp_path / "index.json")
+    monkeypatch.setattr(stl_index, "_index", None)
+    monkeypatch.setattr(stl_index, "_stamps", {})
+    info = stl_index.info("cube.stl", (0, 0, 0), (1, 0, 0))
+    assert info["bound"] == pytest.approx([1, 0, 0, 2, 1, 1])
+    assert len(info["hash"]) == 40
+    assert not (tmp_path / "index.json").exists()
+    stl_index.save()
+    assert (tmp_path / "index.json").is_file()
+
+def test_info_drops_entries_when_a_model_changes(tmp_path, monkeypatch):
+    write_binary(tmp_path / "cube.stl", cube())
+    monkeypatch.setattr(stl_index, "stl_path", tmp_path)
+    monkeypatch.setattr(stl_index, "index_file", tmp_path / "index.json")
+    monkeypatch.setattr(stl_index, "_index", None)
+    monkeypatch.setattr(stl_index, "_stamps", {})
+    first = stl_index.info("cube.stl")
+    write_binary(tmp_path / "cube.stl", cube()*3)
+    stl_index._stamps.clear()
+    second = stl_index.info("cube.stl")
+    assert second["hash"] != first["hash"]
+    assert second["bound"] == pytest.approx([0, 0, 0, 3, 3, 3])
+
+def test_refresh_reports_missing_models_and_drops_runtime_entries(tmp_path, monkeypatch, capsys):
+    write_binary(tmp_path / "cube.stl", cube())
+    monkeypatch.setattr(stl_index, "stl_path", tmp_path)
+    monkeypatch.setattr(stl_index, "index_file", tmp_path / "index.json")
+    monkeypatch.setattr(stl_index, "_index", None)
+    monkeypatch.setattr(stl_index, "_stamps", {})
+    monkeypatch.setattr(stl_index, "_known_transforms", lambda: [("cube.stl", (0, 0, 0), (0, 0, 0)), ("gone.stl", (0, 0, 0), (0, 0, 0))])
+    stl_index.info("cube.stl", (0, 0, 0), (5, 0, 0))
+    stl_index.refresh()
+    assert "gone.stl" in capsys.readouterr().out
+    assert list(stl_index.load()["entries"]) == [stl_index._entry_key("cube.stl", (0, 0, 0), (0, 0, 0), 1)]
+    assert (tmp_path / "index.json").is_file()